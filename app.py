@@ -1,4 +1,5 @@
 import os
+import re
 import logging
 import traceback
 import json
@@ -19,7 +20,7 @@ from services.html_to_pdf import html_to_pdf_converter
 from utils.text import TextProcessor, ContentValidator
 from utils.style import StyleApplicator
 from models.cv_data import CVData, ContactInfo, RoleExperience, ExperienceBullet
-from services.template_engine import template_engine
+from services.template_engine import get_template_engine
 from services.sample_cv_parser import parse_and_cache_sample_cv
 from services.defaults_loader import defaults_loader
 
@@ -35,6 +36,128 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Captures the JSON object inside a ```json fence in one pass; the closing fence may be missing
+_JSON_FENCE_RE = re.compile(r'```(?:json)?\s*(\{.*?\})\s*(?:```|\Z)', re.DOTALL)
+
+# Static prompt bodies are built once and sent as the system message; only the retrieved
+# context goes in the user turn, so the prefix stays byte-identical for provider prompt caching
+_TOP_SKILLS_PROMPT = """You are an expert CV writer and ATS optimizer for senior engineering leadership roles.
+Read two attached input files (PDFs):
+- FILE 1: Job_Description.pdf → complete job description
+- FILE 2: CV_ExperienceSummary_Skills_Superset - Google Docs.pdf → my full "experience superset"
+
+GOAL
+Produce EXACTLY 10 skills (max two words each) that:
+- Are directly derived from the JD's language.
+- Are ordered by PRIORITY based on the JD's stated and implied requirements.
+- Are present in (or credibly supported by) my Experience Superset to avoid listing skills I don't have.
+
+SKILL RULES
+- Each skill must be ≤ 2 words, Title Case, and ideally reuse JD keywords verbatim.
+- Prefer JD phrasing over synonyms; only use a close synonym if the exact JD term cannot fit in ≤ 2 words.
+- No duplication or near-duplicates (e.g., "Platform Engineering" vs "Platform Ops"—pick one).
+- Use international English unless the JD clearly uses US spelling.
+- Do NOT add commentary, definitions, or examples.
+
+PRIORITY RULES (ORDER HIGHEST → LOWEST)
+1) Mission-critical competencies and leadership scope explicitly required by the JD.
+2) Skills/terms repeated or emphasised in the JD (high keyword frequency or prominence).
+3) Strategic differentiators likely valued for this role (use your industry knowledge), when also supported by my Superset.
+
+PROCESS (AI internal reasoning; do NOT include in output)
+1) Parse Job_Description.pdf → extract competencies, requirements, repeated keywords, leadership scope, domain/tech stack.
+2) Parse the Superset PDF → identify which JD skills I can credibly claim.
+3) Build a candidate skill list from JD terms (≤ 2 words), mapped to my Superset.
+4) Rank candidates using the priority rules; remove overlaps and near-duplicates.
+5) Final check for clarity, JD wording fidelity, and ATS friendliness.
+
+OUTPUT FORMAT (strict)
+- Output ONLY the 10 skills, one per line, highest priority first.
+- No numbering, no bullets, no extra text.
+- Each line must be exactly a ≤ 2-word skill in Title Case.
+
+CONSTRAINTS
+- Use ONLY skills supported by my Superset (no fabrication).
+- Keep every skill ≤ 2 words; compress longer JD phrases while preserving meaning (e.g., "Incident Management," "Vendor Strategy").
+- Avoid buzzword noise; each skill must map to a concrete competency in the JD.
+
+QUALITY BAR
+- Challenge your first pass: does each skill mirror JD language, reflect priority, and align with my Superset?
+- Assume review by both ATS and a CTO—optimise for accuracy, clarity, and relevance.
+
+"""
+
+_EXEC_SUMMARY_PROMPT = """You are an expert CV writer and ATS optimizer for senior engineering leadership roles.
+
+GOAL
+Read two attached input files (PDFs):
+- FILE 1: Job_Description.pdf → complete job description
+- FILE 2: CV_ExperienceSummary_Skills_Superset - Google Docs.pdf → my full "experience superset"
+
+Produce ONE high-impact **Career Summary** (≤40 words) that:
+- Is written in a polished, executive tone.
+- Directly aligns with the JD using keywords naturally.
+- Demonstrates leadership scope, technical expertise, and business impact.
+- Prioritises mission-critical competencies stated or implied in the JD.
+- Is concise, powerful, and ATS-friendly.
+
+SUMMARY RULES
+- ≤40 words, single paragraph.
+- No first-person pronouns, fluff, or vague adjectives.
+- Integrate the highest-priority keywords from the JD.
+- Highlight leadership scale, strategic contributions, and technical breadth.
+- Use international English unless the JD uses US spelling.
+
+PRIORITY RULES
+1. Core leadership and engineering competencies the JD emphasises.
+2. High-frequency JD keywords and themes.
+3. Strategic differentiators (e.g., AI adoption, vendor mgmt, cloud cost optimisation) supported by my Superset.
+
+PROCESS (internal, do NOT include in output)
+1. Parse the JD → extract repeated competencies, seniority level, domain focus, and business goals.
+2. Parse the Superset → map accomplishments and skills.
+3. Select only the highest-priority elements.
+4. Craft a concise, impactful executive summary using JD language.
+5. Final pass: tighten wording to ≤40 words; ensure ATS optimisation.
+
+OUTPUT FORMAT (strict)
+- Output ONLY the single summary text in one paragraph, ≤40 words.
+- No labels, no headings, no commentary.
+
+QUALITY BAR
+- Pretend this will sit at the top of a CTO-level CV and be scanned by ATS and executive recruiters.
+- Ensure clarity, measurable leadership impact, and keyword relevance.
+
+"""
+
+_JD_SUPERSET_CONTEXT_BLOCK = """JOB DESCRIPTION CONTEXT:
+{job_context}
+
+EXPERIENCE SUPERSET CONTEXT:
+{experience_context}
+
+BEGIN."""
+
+_ADDITIONAL_INFO_PROMPT = """
+Extract and organize additional professional information into a compact 2-column table format.
+
+GOAL:
+- Create a professional 2-column table: Category | Details
+- Include: Certifications, Awards, Education, Training, Languages, etc.
+- Keep entries concise and impactful
+- Maximum 8 rows
+
+OUTPUT FORMAT:
+| Category | Details |
+|----------|---------|
+| Certifications | List relevant certifications |
+| Awards | Notable achievements |
+| Education | Degrees/qualifications |
+| Training | Key training programs |
+
+Return only the table, no additional text.
+"""
+
 def initialize_session_state():
     defaults = {
         'processed_documents': None,
@@ -528,14 +651,22 @@ def generate_cover_letter(llm_service, context_builder, auto_retry, max_retries,
             
             cover_letter_prompt = load_prompt5(company_name, role_title)
             
+            # Stream tokens into a placeholder so text appears at first-token latency
+            stream_placeholder = st.empty()
+            
             for attempt in range(max_retries + 1):
-                result = llm_service.generate_cover_letter(cover_letter_prompt, context)
+                streamed_content = stream_placeholder.write_stream(
+                    llm_service.generate_cover_letter_stream(cover_letter_prompt, context)
+                )
+                result = llm_service.build_cover_letter_result(streamed_content)
                 
                 if result["valid"] or not auto_retry or attempt == max_retries:
                     break
                 
                 st.warning(f"⚠️ Attempt {attempt + 1} failed validation. Retrying...")
             
+            stream_placeholder.empty()
+            
             st.session_state.generated_cover_letter = result["content"]
             st.session_state.validation_results["cover_letter"] = result["validation"]
             
@@ -1156,59 +1287,11 @@ def generate_top_skills(llm_service, context_builder):
                 "skills technical competencies expertise experience achievements"
             )["context"]
             
-            prompt = f"""You are an expert CV writer and ATS optimizer for senior engineering leadership roles.
-Read two attached input files (PDFs):
-- FILE 1: Job_Description.pdf → complete job description
-- FILE 2: CV_ExperienceSummary_Skills_Superset - Google Docs.pdf → my full "experience superset"
-
-JOB DESCRIPTION CONTEXT:
-{job_context}
-
-EXPERIENCE SUPERSET CONTEXT:
-{experience_context}
-
-GOAL
-Produce EXACTLY 10 skills (max two words each) that:
-- Are directly derived from the JD's language.
-- Are ordered by PRIORITY based on the JD's stated and implied requirements.
-- Are present in (or credibly supported by) my Experience Superset to avoid listing skills I don't have.
-
-SKILL RULES
-- Each skill must be ≤ 2 words, Title Case, and ideally reuse JD keywords verbatim.
-- Prefer JD phrasing over synonyms; only use a close synonym if the exact JD term cannot fit in ≤ 2 words.
-- No duplication or near-duplicates (e.g., "Platform Engineering" vs "Platform Ops"—pick one).
-- Use international English unless the JD clearly uses US spelling.
-- Do NOT add commentary, definitions, or examples.
-
-PRIORITY RULES (ORDER HIGHEST → LOWEST)
-1) Mission-critical competencies and leadership scope explicitly required by the JD.
-2) Skills/terms repeated or emphasised in the JD (high keyword frequency or prominence).
-3) Strategic differentiators likely valued for this role (use your industry knowledge), when also supported by my Superset.
-
-PROCESS (AI internal reasoning; do NOT include in output)
-1) Parse Job_Description.pdf → extract competencies, requirements, repeated keywords, leadership scope, domain/tech stack.
-2) Parse the Superset PDF → identify which JD skills I can credibly claim.
-3) Build a candidate skill list from JD terms (≤ 2 words), mapped to my Superset.
-4) Rank candidates using the priority rules; remove overlaps and near-duplicates.
-5) Final check for clarity, JD wording fidelity, and ATS friendliness.
-
-OUTPUT FORMAT (strict)
-- Output ONLY the 10 skills, one per line, highest priority first.
-- No numbering, no bullets, no extra text.
-- Each line must be exactly a ≤ 2-word skill in Title Case.
-
-CONSTRAINTS
-- Use ONLY skills supported by my Superset (no fabrication).
-- Keep every skill ≤ 2 words; compress longer JD phrases while preserving meaning (e.g., "Incident Management," "Vendor Strategy").
-- Avoid buzzword noise; each skill must map to a concrete competency in the JD.
-
-QUALITY BAR
-- Challenge your first pass: does each skill mirror JD language, reflect priority, and align with my Superset?
-- Assume review by both ATS and a CTO—optimise for accuracy, clarity, and relevance.
-
-BEGIN."""
+            user_prompt = _JD_SUPERSET_CONTEXT_BLOCK.format(
+                job_context=job_context, experience_context=experience_context
+            )
             
-            response = llm_service.generate_content(prompt, max_tokens=500)
+            response = llm_service.generate_content_with_system(_TOP_SKILLS_PROMPT, user_prompt, max_tokens=500)
             
             # Store in session state
             if 'individual_generations' not in st.session_state:
@@ -1291,12 +1374,8 @@ RESPONSE MUST BE VALID JSON ONLY - NO OTHER TEXT OR FORMATTING."""
             # Parse the JSON response
             try:
                 # Clean the response - remove common prefixes/suffixes and markdown formatting
-                clean_response = role_extraction.strip()
-                if clean_response.startswith("```json"):
-                    clean_response = clean_response[7:]
-                if clean_response.endswith("```"):
-                    clean_response = clean_response[:-3]
-                clean_response = clean_response.strip()
+                fence_match = _JSON_FENCE_RE.search(role_extraction)
+                clean_response = (fence_match.group(1) if fence_match else role_extraction).strip()
                 
                 extracted_data = json.loads(clean_response)
                 role_data = extracted_data.get('role_data', extracted_data)  # Handle both formats
@@ -1393,16 +1472,8 @@ Return ONLY the JSON object with exactly 8 bullets, no additional text."""
             bullets_response = llm_service.generate_content(bullet_prompt, max_tokens=800)
             
             # Clean the response - remove markdown code blocks if present
-            cleaned_response = bullets_response.strip()
-            if '```json' in cleaned_response:
-                # Extract JSON from markdown code block
-                start_idx = cleaned_response.find('```json') + 7
-                end_idx = cleaned_response.find('```', start_idx)
-                if end_idx > start_idx:
-                    cleaned_response = cleaned_response[start_idx:end_idx].strip()
-            elif '```' in cleaned_response:
-                # Remove any markdown code blocks
-                cleaned_response = cleaned_response.replace('```', '').strip()
+            fence_match = _JSON_FENCE_RE.search(bullets_response)
+            cleaned_response = (fence_match.group(1) if fence_match else bullets_response).strip()
             
             # Parse the bullets JSON response
             try:
@@ -1458,56 +1529,11 @@ def generate_executive_summary(llm_service, context_builder):
                 "professional summary career experience background achievements leadership"
             )["context"]
             
-            prompt = f"""You are an expert CV writer and ATS optimizer for senior engineering leadership roles.
-
-GOAL
-Read two attached input files (PDFs):
-- FILE 1: Job_Description.pdf → complete job description
-- FILE 2: CV_ExperienceSummary_Skills_Superset - Google Docs.pdf → my full "experience superset"
-
-JOB DESCRIPTION CONTEXT:
-{job_context}
-
-EXPERIENCE SUPERSET CONTEXT:
-{experience_context}
-
-Produce ONE high-impact **Career Summary** (≤40 words) that:
-- Is written in a polished, executive tone.
-- Directly aligns with the JD using keywords naturally.
-- Demonstrates leadership scope, technical expertise, and business impact.
-- Prioritises mission-critical competencies stated or implied in the JD.
-- Is concise, powerful, and ATS-friendly.
-
-SUMMARY RULES
-- ≤40 words, single paragraph.
-- No first-person pronouns, fluff, or vague adjectives.
-- Integrate the highest-priority keywords from the JD.
-- Highlight leadership scale, strategic contributions, and technical breadth.
-- Use international English unless the JD uses US spelling.
-
-PRIORITY RULES
-1. Core leadership and engineering competencies the JD emphasises.
-2. High-frequency JD keywords and themes.
-3. Strategic differentiators (e.g., AI adoption, vendor mgmt, cloud cost optimisation) supported by my Superset.
-
-PROCESS (internal, do NOT include in output)
-1. Parse the JD → extract repeated competencies, seniority level, domain focus, and business goals.
-2. Parse the Superset → map accomplishments and skills.
-3. Select only the highest-priority elements.
-4. Craft a concise, impactful executive summary using JD language.
-5. Final pass: tighten wording to ≤40 words; ensure ATS optimisation.
-
-OUTPUT FORMAT (strict)
-- Output ONLY the single summary text in one paragraph, ≤40 words.
-- No labels, no headings, no commentary.
-
-QUALITY BAR
-- Pretend this will sit at the top of a CTO-level CV and be scanned by ATS and executive recruiters.
-- Ensure clarity, measurable leadership impact, and keyword relevance.
-
-BEGIN."""
+            user_prompt = _JD_SUPERSET_CONTEXT_BLOCK.format(
+                job_context=job_context, experience_context=experience_context
+            )
             
-            response = llm_service.generate_content(prompt, max_tokens=200)
+            response = llm_service.generate_content_with_system(_EXEC_SUMMARY_PROMPT, user_prompt, max_tokens=200)
             
             # Store in session state
             if 'individual_generations' not in st.session_state:
@@ -1972,30 +1998,9 @@ def generate_additional_info_section(llm_service, context_builder):
         if not additional_context.strip():
             return ""
         
-        prompt = f"""
-Extract and organize additional professional information into a compact 2-column table format.
-
-CONTEXT:
-{additional_context}
-
-GOAL:
-- Create a professional 2-column table: Category | Details
-- Include: Certifications, Awards, Education, Training, Languages, etc.
-- Keep entries concise and impactful
-- Maximum 8 rows
-
-OUTPUT FORMAT:
-| Category | Details |
-|----------|---------|
-| Certifications | List relevant certifications |
-| Awards | Notable achievements |
-| Education | Degrees/qualifications |
-| Training | Key training programs |
-
-Return only the table, no additional text.
-"""
-        
-        additional_info = llm_service.generate_content(prompt, max_tokens=500)
+        additional_info = llm_service.generate_content_with_system(
+            _ADDITIONAL_INFO_PROMPT, f"CONTEXT:\n{additional_context}", max_tokens=500
+        )
         return f"\n\n**ADDITIONAL INFORMATION**\n\n{additional_info}"
         
     except Exception as e:
@@ -2101,7 +2106,7 @@ def show_cv_preview():
     try:
         # Use template engine to generate consistent preview content
         cv_data = convert_session_to_cvdata()
-        preview_content = template_engine.render_cv_preview(cv_data)
+        preview_content = get_template_engine().render_cv_preview(cv_data)
         
         # Show CV preview with toggle for expanded view  
         expanded_view = st.checkbox("📖 Show full-width CV preview", value=False, help="Check to see CV preview in full page width")
@@ -2355,13 +2360,15 @@ def validate_cv_structure(cv_content):
         'sections_found': sections_found
     }
 
-def convert_session_to_cvdata() -> CVData:
-    """Convert session state data to structured CVData format"""
+def convert_session_to_cvdata(session=None) -> CVData:
+    """Convert session state data (st.session_state unless a mapping is given) to structured CVData format"""
     from datetime import datetime
     import json
     
+    session = st.session_state if session is None else session
+    
     # Get contact information
-    contact_data = st.session_state.get('whole_cv_contact', {})
+    contact_data = session.get('whole_cv_contact', {})
     contact = ContactInfo(
         name=contact_data.get('name', ''),
         email=contact_data.get('email', ''),
@@ -2372,8 +2379,8 @@ def convert_session_to_cvdata() -> CVData:
     )
     
     # Get individual sections
-    individual_sections = st.session_state.get('individual_generations', {})
-    llm_json_responses = st.session_state.get('llm_json_responses', {})
+    individual_sections = session.get('individual_generations', {})
+    llm_json_responses = session.get('llm_json_responses', {})
     
     # Extract professional summary
     professional_summary = individual_sections.get('executive_summary', '')
@@ -2438,8 +2445,8 @@ def convert_session_to_cvdata() -> CVData:
             job_title = role_data.get('position_name', 'Current Position')
             
             # Override with sample CV data if available
-            if 'sample_cv_json' in st.session_state and st.session_state.get('sample_cv_parsed'):
-                sample_cv_data = st.session_state.sample_cv_json
+            if 'sample_cv_json' in session and session.get('sample_cv_parsed'):
+                sample_cv_data = session['sample_cv_json']
                 if sample_cv_data and 'experience' in sample_cv_data:
                     experiences = sample_cv_data['experience']
                     if experiences and len(experiences) > 0:
@@ -2479,8 +2486,8 @@ def convert_session_to_cvdata() -> CVData:
             job_title = 'Current Position'
             
             # Override with sample CV data if available
-            if 'sample_cv_json' in st.session_state and st.session_state.get('sample_cv_parsed'):
-                sample_cv_data = st.session_state.sample_cv_json
+            if 'sample_cv_json' in session and session.get('sample_cv_parsed'):
+                sample_cv_data = session['sample_cv_json']
                 if sample_cv_data and 'experience' in sample_cv_data:
                     experiences = sample_cv_data['experience']
                     if experiences and len(experiences) > 0:
@@ -2506,8 +2513,8 @@ def convert_session_to_cvdata() -> CVData:
         location = 'City, Country'
         job_title = 'Position Title'
         
-        if 'sample_cv_json' in st.session_state and st.session_state.get('sample_cv_parsed'):
-            sample_cv_data = st.session_state.sample_cv_json
+        if 'sample_cv_json' in session and session.get('sample_cv_parsed'):
+            sample_cv_data = session['sample_cv_json']
             if sample_cv_data and 'experience' in sample_cv_data:
                 experiences = sample_cv_data['experience']
                 if experiences and len(experiences) > 0:
@@ -2615,7 +2622,7 @@ def show_cv_preview_structured():
         # Option 1: Use structured CVData if available
         try:
             cv_data = convert_session_to_cvdata()
-            formatted_cv = template_engine.render_cv_preview(cv_data)
+            formatted_cv = get_template_engine().render_cv_preview(cv_data)
             template_source = "CVData + Jinja2 Template"
         except Exception as cvdata_error:
             logger.warning(f"CVData conversion failed: {cvdata_error}, using session data directly")
@@ -2625,7 +2632,7 @@ def show_cv_preview_structured():
                 'llm_json_responses': st.session_state.get('llm_json_responses', {}),
                 'individual_generations': st.session_state.get('individual_generations', {})
             }
-            formatted_cv = template_engine.render_cv_from_session_data(session_data, contact_info)
+            formatted_cv = get_template_engine().render_cv_from_session_data(session_data, contact_info)
             template_source = "Session Data + Jinja2 Template"
         
         with st.expander("👁️ Complete CV Preview (Template Engine) - Click to expand", expanded=True):
@@ -2676,7 +2683,7 @@ def generate_cv_html_for_new_tab():
         
         # Convert to structured format and generate CV markdown
         cv_data = convert_session_to_cvdata()
-        markdown_content = template_engine.render_cv_preview(cv_data)
+        markdown_content = get_template_engine().render_cv_preview(cv_data)
         
         # Convert markdown to HTML with the same styling as our HTML-to-PDF converter
         import markdown
@@ -2950,7 +2957,7 @@ def generate_cv_pdf_structured():
             return None
         
         # Generate CV preview markdown content (same as what user sees)
-        markdown_content = template_engine.render_cv_preview(cv_data)
+        markdown_content = get_template_engine().render_cv_preview(cv_data)
         
         # Validate that we have actual content
         if not markdown_content or len(markdown_content.strip()) < 100:
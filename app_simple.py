@@ -540,9 +540,26 @@ def generate_cv(llm_service, context_builder):
             summary_result = None
             if job_description and (experience_superset or skills_superset):
                 with st.spinner("📝 Generating executive professional summary..."):
-                    summary_result = summary_generator.generate_professional_summary(
-                        job_description, experience_superset, skills_superset
-                    )
+                    if summary_generator.config.use_streaming():
+                        # Stream tokens into a placeholder so text appears at first-token latency
+                        stream_placeholder = st.empty()
+                        try:
+                            streamed_summary = stream_placeholder.write_stream(
+                                summary_generator.generate_professional_summary_stream(
+                                    job_description, experience_superset, skills_superset
+                                )
+                            )
+                            summary_result = summary_generator.build_summary_result(streamed_summary, job_description)
+                        except Exception as e:
+                            summary_result = summary_generator.build_error_result(e)
+                        finally:
+                            # Drop the streamed draft, which is cut mid-sentence when the word limit aborts it;
+                            # the summary and its validation result are shown in the preview below
+                            stream_placeholder.empty()
+                    else:
+                        summary_result = summary_generator.generate_professional_summary(
+                            job_description, experience_superset, skills_superset
+                        )
                     
                     if summary_result["valid"]:
                         st.success(f"✅ Generated professional summary ({summary_result['word_count']}/30 words)")
@@ -4,9 +4,15 @@ CV Data Model - Structured data representation for CV content
 
 from typing import Dict, List, Optional
 from dataclasses import dataclass, field, asdict
+from datetime import datetime
 import json
 
 
+def _timestamp() -> str:
+    """Generation timestamp in the format shown on rendered CVs"""
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
 @dataclass
 class ContactInfo:
     """Contact information structure"""
@@ -42,13 +48,23 @@ class RoleExperience:
     end_date: str
     bullets: List[ExperienceBullet] = field(default_factory=list)
     
+    @property
+    def work_duration(self) -> str:
+        """Start-end date range shown in templates"""
+        return f"{self.start_date} - {self.end_date}"
+    
+    @property
+    def formatted_bullets(self) -> List[str]:
+        """Bullets with bold headings, built fresh from the current bullets"""
+        return [bullet.to_formatted_string() for bullet in self.bullets]
+    
     def to_dict(self):
         return {
             'job_title': self.job_title,
             'company': self.company,
             'location': self.location,
-            'dates': f"{self.start_date} - {self.end_date}",
-            'bullets': [bullet.to_formatted_string() for bullet in self.bullets]
+            'dates': self.work_duration,
+            'bullets': self.formatted_bullets
         }
 
 
@@ -76,7 +92,7 @@ class CVData:
     
     # Metadata
     style_profile: Optional[Dict] = None
-    generated_at: Optional[str] = None
+    generated_at: str = field(default_factory=_timestamp)
     
     def to_dict(self) -> Dict:
         """Convert to dictionary for JSON serialization"""
@@ -145,7 +161,7 @@ class CVData:
             previous_roles=previous_roles,
             additional_info=data.get('additional_info'),
             style_profile=data.get('style_profile'),
-            generated_at=data.get('generated_at')
+            generated_at=data.get('generated_at') or _timestamp()
         )
     
     def format_for_preview(self) -> str:
@@ -169,13 +185,13 @@ class CVData:
         exp_lines = [f"**PROFESSIONAL EXPERIENCE**\n"]
         
         # Current role
-        exp_lines.append(f"{self.current_role.job_title} | {self.current_role.company}, {self.current_role.location} | {self.current_role.start_date} - {self.current_role.end_date}\n")
+        exp_lines.append(f"{self.current_role.job_title} | {self.current_role.company}, {self.current_role.location} | {self.current_role.work_duration}\n")
         for bullet in self.current_role.bullets:
             exp_lines.append(f"• {bullet.to_formatted_string()}")
         
         # Previous roles
         for role in self.previous_roles:
-            exp_lines.append(f"\n{role.job_title} | {role.company}, {role.location} | {role.start_date} - {role.end_date}\n")
+            exp_lines.append(f"\n{role.job_title} | {role.company}, {role.location} | {role.work_duration}\n")
             for bullet in role.bullets:
                 exp_lines.append(f"• {bullet.to_formatted_string()}")
         
@@ -2,6 +2,6 @@
 Services package for CV and Cover Letter Generator
 """
 
-from .template_engine import template_engine
+from .template_engine import get_template_engine
 
-__all__ = ['template_engine']
\ No newline at end of file
+__all__ = ['get_template_engine']
\ No newline at end of file
@@ -3,16 +3,23 @@ import logging
 from typing import List, Dict, Any, Optional
 from pathlib import Path
 
+import faiss
+import numpy as np
 import streamlit as st
 from pypdf import PdfReader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain.docstore.document import Document
 from openai import OpenAI
 
 logger = logging.getLogger(__name__)
 
+# HNSW graph parameters: neighbours per node and build-time candidate list size
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+
 class PDFIngestor:
     def __init__(self):
         self.embeddings = HuggingFaceEmbeddings(
@@ -449,6 +456,7 @@ Raw skills text to process:
                         page_content=chunk,
                         metadata={
                             "source": doc_type,
+                            "source_lc": doc_type.lower(),
                             "chunk_id": i,
                             "total_chunks": len(chunks)
                         }
@@ -460,7 +468,26 @@ Raw skills text to process:
         if not documents:
             raise ValueError("No documents provided for vector store creation")
         
-        self.vector_store = FAISS.from_documents(documents, self.embeddings)
+        texts = [doc.page_content for doc in documents]
+        vectors = self.embeddings.embed_documents(texts)
+        
+        # HNSW graph search runs over 8-bit scalar-quantized codes (4x fewer bytes than FP32);
+        # the refine layer re-scores the top candidates against full-precision vectors
+        base_index = faiss.IndexHNSWSQ(len(vectors[0]), faiss.ScalarQuantizer.QT_8bit, HNSW_M)
+        base_index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        index = faiss.IndexRefineFlat(base_index)
+        index.train(np.asarray(vectors, dtype=np.float32))
+        
+        self.vector_store = FAISS(
+            embedding_function=self.embeddings,
+            index=index,
+            docstore=InMemoryDocstore(),
+            index_to_docstore_id={}
+        )
+        self.vector_store.add_embeddings(
+            zip(texts, vectors),
+            metadatas=[doc.metadata for doc in documents]
+        )
         return self.vector_store
     
     def ingest_pdfs(self, uploaded_files: Dict[str, Any]) -> Dict[str, Any]:
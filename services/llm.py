@@ -1,18 +1,61 @@
 import os
+import json
 import logging
 import time
+import random
 import re
-from typing import Dict, Any, Optional, List
+import importlib.util
+from functools import cached_property
+from typing import Dict, Any, Optional, List, Iterator
 from dataclasses import dataclass
 from enum import Enum
 
+import httpx
 import streamlit as st
-from openai import OpenAI
-from langchain_openai import ChatOpenAI
-from langchain.schema import HumanMessage, SystemMessage
+from openai import (
+    OpenAI, RateLimitError, BadRequestError, AuthenticationError,
+    PermissionDeniedError, NotFoundError
+)
 
 logger = logging.getLogger(__name__)
 
+# Accepts an (optionally bulleted) SAR line and captures its two heading words
+_SAR_BULLET_RE = re.compile(r'^\s*[\•\-\*]?\s*(\w+)\s+(\w+):')
+
+# Section header keywords in priority order; IGNORECASE avoids an upper-cased copy per line
+_SECTION_HEADER_RES = (
+    ("career_summary", re.compile(r'SUMMARY', re.IGNORECASE)),
+    ("experience", re.compile(r'EXPERIENCE', re.IGNORECASE)),
+    ("skills", re.compile(r'SKILLS|CORE COMPETENCIES', re.IGNORECASE)),
+)
+
+_SKILL_RES = (
+    re.compile(r'^\s*[\•\-\*]\s*(\w+(?:\s+\w+)?)\s*$'),
+    re.compile(r'^(\w+(?:\s+\w+)?)\s*[,\|]?'),
+)
+
+# HTTP/2 needs the optional h2 package; fall back to HTTP/1.1 keep-alive without it
+_HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Client errors that will fail identically on every attempt
+_NON_RETRYABLE_ERRORS = (BadRequestError, AuthenticationError, PermissionDeniedError, NotFoundError)
+
+CV_PACKAGE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "career_summary": {"type": "string"},
+        "experience_bullets": {"type": "array", "items": {"type": "string"}},
+        "skills": {"type": "array", "items": {"type": "string"}}
+    },
+    "required": ["career_summary", "experience_bullets", "skills"],
+    "additionalProperties": False
+}
+
+CV_PACKAGE_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "cv_package", "schema": CV_PACKAGE_SCHEMA, "strict": True}
+}
+
 class ModelType(Enum):
     GPT_4O_MINI = "gpt-4o-mini"
     GPT_4O = "gpt-4o"
@@ -45,27 +88,15 @@ class CVPackageValidator:
     
     @staticmethod
     def validate_sar_bullets(text: str) -> Dict[str, Any]:
-        bullet_patterns = [
-            r'^\s*[\•\-\*]\s*\w+\s+\w+:',
-            r'^\s*\w+\s+\w+:',
-        ]
-        
-        lines = [line.strip() for line in text.split('\n') if line.strip()]
+        lines = [stripped for stripped in (line.strip() for line in text.splitlines()) if stripped]
         bullets = []
+        two_word_headings = []
         
         for line in lines:
-            for pattern in bullet_patterns:
-                if re.match(pattern, line):
-                    bullets.append(line)
-                    break
-        
-        two_word_headings = []
-        for bullet in bullets:
-            heading_match = re.match(r'^\s*[\•\-\*]?\s*(\w+\s+\w+):', bullet)
+            heading_match = _SAR_BULLET_RE.match(line)
             if heading_match:
-                heading = heading_match.group(1)
-                if len(heading.split()) == 2:
-                    two_word_headings.append(heading)
+                bullets.append(line)
+                two_word_headings.append(f"{heading_match.group(1)} {heading_match.group(2)}")
         
         return {
             "valid": len(bullets) == 8 and len(two_word_headings) == 8,
@@ -77,24 +108,24 @@ class CVPackageValidator:
     
     @staticmethod
     def validate_skills(text: str) -> Dict[str, Any]:
-        skill_patterns = [
-            r'^\s*[\•\-\*]\s*(\w+(?:\s+\w+)?)\s*$',
-            r'^(\w+(?:\s+\w+)?)\s*[,\|]?',
-        ]
-        
-        lines = [line.strip() for line in text.split('\n') if line.strip()]
-        skills = []
-        
-        for line in lines:
-            for pattern in skill_patterns:
-                matches = re.findall(pattern, line)
-                for match in matches:
-                    skill = match.strip().strip(',|')
-                    if skill and len(skill.split()) <= 2:
-                        skills.append(skill)
+        lines = [stripped for stripped in (line.strip() for line in text.splitlines()) if stripped]
+        
+        candidates = (
+            match.group(1).strip().strip(',|')
+            for line in lines
+            for pattern in _SKILL_RES
+            for match in pattern.finditer(line)
+        )
+        
+        # Insertion-ordered dedup; stop scanning once 10 unique skills are collected
+        seen = {}
+        for skill in candidates:
+            if skill and len(skill.split()) <= 2 and skill not in seen:
+                seen[skill] = None
+                if len(seen) == 10:
+                    break
         
-        skills = list(set(skills))[:10]
-        valid_skills = [s for s in skills if len(s.split()) <= 2]
+        valid_skills = list(seen)
         
         return {
             "valid": len(valid_skills) == 10,
@@ -102,6 +133,17 @@ class CVPackageValidator:
             "skills": valid_skills,
             "message": f"Skills: {len(valid_skills)}/10 found (≤2 words each)"
         }
+    
+    @staticmethod
+    def validate_skill_list(skills: List[str]) -> Dict[str, Any]:
+        short_skills = [skill for skill in skills if len(skill.split()) <= 2]
+        
+        return {
+            "valid": len(skills) == 10 and len(short_skills) == 10,
+            "skill_count": len(short_skills),
+            "skills": short_skills,
+            "message": f"Skills: {len(short_skills)}/10 found (≤2 words each)"
+        }
 
 class OpenAILLMService:
     @staticmethod
@@ -114,20 +156,37 @@ class OpenAILLMService:
             return {"max_tokens": max_tokens}
     
     def __init__(self, api_key: str, config: LLMConfig = None):
-        self.client = OpenAI(api_key=api_key)
+        # Pooled connections are reused across requests instead of re-handshaking TLS
+        self._http = httpx.Client(
+            timeout=60,
+            http2=_HTTP2_AVAILABLE,
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=64)
+        )
+        # Retries are handled by _create_completion_with_retry, so disable the SDK's own
+        self.client = OpenAI(api_key=api_key, http_client=self._http, max_retries=0)
         self.config = config or LLMConfig(model=ModelType.GPT_4O_MINI)
         self.validator = CVPackageValidator()
         
-        # Initialize LangChain OpenAI with model-compatible parameters
+        self._api_key = api_key
+    
+    @cached_property
+    def langchain_llm(self):
+        """LangChain chat model, imported and built on first access only"""
+        from langchain_openai import ChatOpenAI
+        
         token_params = self._get_model_compatible_params_static(self.config.model.value, self.config.max_tokens)
         langchain_params = {
             "model": self.config.model.value,
             "temperature": self.config.get_temperature(),
-            "openai_api_key": api_key
+            "openai_api_key": self._api_key
         }
         langchain_params.update(token_params)
         
-        self.langchain_llm = ChatOpenAI(**langchain_params)
+        return ChatOpenAI(**langchain_params)
+    
+    def close(self) -> None:
+        """Release pooled HTTP connections"""
+        self._http.close()
     
     def _get_model_compatible_params(self, model: str, max_tokens: int) -> Dict[str, Any]:
         """Get model-compatible parameters for OpenAI API calls"""
@@ -137,7 +196,7 @@ class OpenAILLMService:
         else:
             return {"max_tokens": max_tokens}
     
-    def _make_request_with_retry(self, messages: List[Dict[str, str]], system_prompt: str = None) -> str:
+    def _create_completion_with_retry(self, messages: List[Dict[str, str]], system_prompt: str = None, **kwargs):
         for attempt in range(self.config.retry_attempts):
             try:
                 formatted_messages = []
@@ -149,25 +208,45 @@ class OpenAILLMService:
                 # Get model-compatible parameters
                 token_params = self._get_model_compatible_params(self.config.model.value, self.config.max_tokens)
                 
-                response = self.client.chat.completions.create(
+                return self.client.chat.completions.create(
                     model=self.config.model.value,
                     messages=formatted_messages,
                     temperature=self.config.get_temperature(),
-                    **token_params
+                    **token_params,
+                    **kwargs
                 )
                 
-                return response.choices[0].message.content.strip()
-                
+            except _NON_RETRYABLE_ERRORS:
+                raise
             except Exception as e:
                 logger.warning(f"API request attempt {attempt + 1} failed: {e}")
                 if attempt < self.config.retry_attempts - 1:
-                    time.sleep(self.config.retry_delay * (attempt + 1))
+                    time.sleep(self._get_retry_delay(attempt, e))
                 else:
                     raise e
     
+    def _get_retry_delay(self, attempt: int, error: Exception) -> float:
+        """Exponential backoff with full jitter, deferring to the server's Retry-After on rate limits"""
+        if isinstance(error, RateLimitError):
+            headers = error.response.headers
+            try:
+                if headers.get("retry-after-ms"):
+                    return float(headers["retry-after-ms"]) / 1000
+                if headers.get("retry-after"):
+                    return float(headers["retry-after"])
+            except ValueError:
+                pass
+        
+        return min(60, self.config.retry_delay * (2 ** attempt)) * random.random()
+    
+    def _make_request_with_retry(self, messages: List[Dict[str, str]], system_prompt: str = None) -> str:
+        response = self._create_completion_with_retry(messages, system_prompt)
+        return response.choices[0].message.content.strip()
+    
     def generate_cv_package(self, prompt: str, context: str) -> Dict[str, Any]:
         system_prompt = """You are a professional CV writer specializing in creating ATS-optimized resumes. 
-        You must follow the exact specifications provided in the prompt regarding word counts and formatting requirements."""
+        You must follow the exact specifications provided in the prompt regarding word counts and formatting requirements.
+        Return the career summary, the experience bullets (each starting with a two-word heading followed by a colon) and the skills as JSON fields."""
         
         messages = [
             {
@@ -176,9 +255,26 @@ class OpenAILLMService:
             }
         ]
         
-        response = self._make_request_with_retry(messages, system_prompt)
+        return self._complete_cv_package(messages, system_prompt)
+    
+    def _complete_cv_package(self, messages: List[Dict[str, str]], system_prompt: str) -> Dict[str, Any]:
+        try:
+            completion = self._create_completion_with_retry(
+                messages, system_prompt, response_format=CV_PACKAGE_RESPONSE_FORMAT
+            )
+            response = completion.choices[0].message.content.strip()
+        except BadRequestError as e:
+            # Models without structured-output support reject response_format
+            logger.warning(f"Structured output unavailable, falling back to free-form text: {e}")
+            response = self._make_request_with_retry(messages, system_prompt)
         
-        validation_results = self._validate_cv_package(response)
+        try:
+            package = json.loads(response)
+            validation_results = self._validate_structured_cv_package(package)
+            # Keep "content" in the sectioned text format the UI and improve_response expect
+            response = self._format_structured_cv_package(package)
+        except (json.JSONDecodeError, TypeError, AttributeError):
+            validation_results = self._validate_cv_package(response)
         
         return {
             "content": response,
@@ -187,7 +283,7 @@ class OpenAILLMService:
             "valid": all(v.get("valid", False) for v in validation_results.values())
         }
     
-    def generate_cover_letter(self, prompt: str, context: str) -> Dict[str, Any]:
+    def _create_cover_letter_request(self, prompt: str, context: str):
         system_prompt = """You are a professional cover letter writer. Create compelling, ATS-optimized cover letters 
         that are concise and targeted. Follow the word count limits strictly."""
         
@@ -198,8 +294,27 @@ class OpenAILLMService:
             }
         ]
         
+        return messages, system_prompt
+    
+    def generate_cover_letter(self, prompt: str, context: str) -> Dict[str, Any]:
+        messages, system_prompt = self._create_cover_letter_request(prompt, context)
+        
         response = self._make_request_with_retry(messages, system_prompt)
         
+        return self.build_cover_letter_result(response)
+    
+    def generate_cover_letter_stream(self, prompt: str, context: str) -> Iterator[str]:
+        """Yield cover letter text as it arrives; validate the joined text with build_cover_letter_result"""
+        messages, system_prompt = self._create_cover_letter_request(prompt, context)
+        
+        response = self._create_completion_with_retry(messages, system_prompt, stream=True)
+        
+        for chunk in response:
+            if chunk.choices:
+                yield chunk.choices[0].delta.content or ""
+    
+    def build_cover_letter_result(self, content: str) -> Dict[str, Any]:
+        response = content.strip()
         word_count = len(response.split())
         
         return {
@@ -237,32 +352,42 @@ class OpenAILLMService:
         
         return results
     
+    def _validate_structured_cv_package(self, package: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            # Missing fields are reported as failed checks rather than raising KeyError
+            "career_summary": self.validator.validate_career_summary(package.get("career_summary", "")),
+            "sar_bullets": self.validator.validate_sar_bullets("\n".join(package.get("experience_bullets", []))),
+            "skills": self.validator.validate_skill_list(package.get("skills", []))
+        }
+    
+    @staticmethod
+    def _format_structured_cv_package(package: Dict[str, Any]) -> str:
+        """Render a structured package with the section headers _extract_sections recognises"""
+        experience = "\n".join(f"• {bullet.lstrip('•-* ')}" for bullet in package.get("experience_bullets", []))
+        skills = "\n".join(f"• {skill}" for skill in package.get("skills", []))
+        
+        return (
+            f"CAREER SUMMARY\n{package.get('career_summary', '')}\n\n"
+            f"PROFESSIONAL EXPERIENCE\n{experience}\n\n"
+            f"CORE SKILLS\n{skills}"
+        )
+    
     def _extract_sections(self, content: str) -> Dict[str, str]:
         sections = {}
         current_section = None
         current_content = []
         
-        lines = content.split('\n')
+        lines = content.splitlines()
         
         for line in lines:
-            line_upper = line.upper().strip()
+            section_name = next(
+                (name for name, header_re in _SECTION_HEADER_RES if header_re.search(line)), None
+            )
             
-            if any(keyword in line_upper for keyword in ['CAREER SUMMARY', 'PROFESSIONAL SUMMARY', 'SUMMARY']):
-                if current_section:
-                    sections[current_section] = '\n'.join(current_content)
-                current_section = "career_summary"
-                current_content = []
-                
-            elif any(keyword in line_upper for keyword in ['EXPERIENCE', 'WORK EXPERIENCE', 'PROFESSIONAL EXPERIENCE']):
+            if section_name:
                 if current_section:
                     sections[current_section] = '\n'.join(current_content)
-                current_section = "experience"
-                current_content = []
-                
-            elif any(keyword in line_upper for keyword in ['SKILLS', 'TECHNICAL SKILLS', 'CORE COMPETENCIES']):
-                if current_section:
-                    sections[current_section] = '\n'.join(current_content)
-                current_section = "skills"
+                current_section = section_name
                 current_content = []
                 
             else:
@@ -289,15 +414,7 @@ class OpenAILLMService:
             }
         ]
         
-        improved_response = self._make_request_with_retry(messages, system_prompt)
-        new_validation = self._validate_cv_package(improved_response)
-        
-        return {
-            "content": improved_response,
-            "validation": new_validation,
-            "model_used": self.config.model.value,
-            "valid": all(v.get("valid", False) for v in new_validation.values())
-        }
+        return self._complete_cv_package(messages, system_prompt)
     
     def _create_improvement_prompt(self, validation_results: Dict[str, Any]) -> str:
         issues = []
@@ -324,6 +441,20 @@ class OpenAILLMService:
         finally:
             # Restore original max_tokens
             self.config.max_tokens = original_max_tokens
+    
+    def generate_content_with_system(self, system_prompt: str, user_prompt: str, max_tokens: int = None) -> str:
+        """Content generation with a stable system prefix and only the variable part in the user turn"""
+        
+        messages = [{"role": "user", "content": user_prompt}]
+        
+        original_max_tokens = self.config.max_tokens
+        if max_tokens:
+            self.config.max_tokens = max_tokens
+        
+        try:
+            return self._make_request_with_retry(messages, system_prompt)
+        finally:
+            self.config.max_tokens = original_max_tokens
 
 @st.cache_resource
 def create_llm_service(model_choice: str):
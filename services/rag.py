@@ -1,24 +1,114 @@
+import io
+import re
+import hashlib
 import logging
-from typing import List, Dict, Any, Optional, Tuple
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from typing import List, Dict, Any, Optional, Tuple, Collection, ClassVar, Mapping
 from dataclasses import dataclass
 
+import faiss
+import numpy as np
 import streamlit as st
 from langchain_community.vectorstores import FAISS
 from langchain.schema import Document
 
+try:
+    import xxhash
+except ImportError:  # optional speedup; blake2b gives the same process-stable keys
+    xxhash = None
+
 logger = logging.getLogger(__name__)
 
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Fixed characters around each doc in the context string: "(Source: {source})\n{content}\n"
+_CONTEXT_PART_OVERHEAD = len("(Source: )\n\n")
+_CONTEXT_SEPARATOR = "\n---\n"
+
+# Upper bound on memoized query embeddings per retriever; the fixed section queries fit easily
+QUERY_VECTOR_CACHE_SIZE = 256
+
+def content_fingerprint(text: str) -> int:
+    """Process-stable 64-bit fingerprint of whitespace-normalized text"""
+    normalized = _WHITESPACE_RE.sub(' ', text).strip().encode('utf-8')
+    if xxhash is not None:
+        return xxhash.xxh3_64_intdigest(normalized)
+    return int.from_bytes(hashlib.blake2b(normalized, digest_size=8).digest(), 'big')
+
 @dataclass
 class RetrievalConfig:
     k: int = 10
     score_threshold: float = 0.7
     diversity_threshold: float = 0.8
     max_context_length: int = 8000
+    ef_search: int = 64
+    refine_k_factor: float = 4.0
+    query_dedup_threshold: float = 0.95
 
 class RAGRetriever:
+    # Pre-lowered doc type filters for the JD and superset retrieval helpers
+    _JD_DOC_TYPES = frozenset({"job_description"})
+    _SUPERSET_DOC_TYPES = frozenset({"experience_superset", "skills_superset", "superset", "experience_summary"})
+    
+    # Fixed retrieval queries, shared read-only across instances
+    _SECTION_QUERIES: ClassVar[Mapping[str, Tuple[str, ...]]] = MappingProxyType({
+        "career_summary": (
+            "professional summary career objective",
+            "years experience achievements accomplishments",
+            "leadership management skills expertise"
+        ),
+        "experience": (
+            "work experience employment history",
+            "job responsibilities achievements results",
+            "projects accomplishments impact metrics"
+        ),
+        "skills": (
+            "technical skills competencies",
+            "software tools technologies",
+            "certifications qualifications expertise"
+        ),
+        "cover_letter": (
+            "job requirements qualifications",
+            "company culture values mission",
+            "relevant experience achievements match"
+        )
+    })
+    _DEFAULT_JD_QUERIES: ClassVar[Tuple[str, ...]] = (
+        "job requirements qualifications must have",
+        "responsibilities duties role expectations",
+        "skills experience needed preferred",
+        "company culture values team environment"
+    )
+    _DEFAULT_SKILL_FOCUS_QUERY: ClassVar[str] = "technical skills experience achievements"
+    _SUPERSET_QUERIES: ClassVar[Tuple[str, ...]] = (
+        "projects accomplishments certifications",
+        "leadership management experience results"
+    )
+    
     def __init__(self, vector_store: FAISS, config: RetrievalConfig = None):
         self.vector_store = vector_store
         self.config = config or RetrievalConfig()
+        self._query_vectors: Dict[str, np.ndarray] = {}
+        self._docstore_positions: Dict[str, int] = {}
+        # ContextBuilder runs JD and superset retrievals concurrently against these caches
+        self._cache_lock = threading.Lock()
+        
+        self._apply_index_search_params(getattr(self.vector_store, "index", None))
+    
+    def _apply_index_search_params(self, index) -> None:
+        """Set search-time knobs on HNSW / refine indexes; flat indexes have none"""
+        while index is not None:
+            if hasattr(index, "k_factor"):
+                # Quantized candidates re-scored against full-precision vectors
+                index.k_factor = self.config.refine_k_factor
+            if hasattr(index, "hnsw"):
+                index.hnsw.efSearch = self.config.ef_search
+                return
+            base_index = getattr(index, "base_index", None)
+            index = faiss.downcast_index(base_index) if base_index is not None else None
         
     def retrieve_context(self, query: str, doc_types: List[str] = None) -> Dict[str, Any]:
         try:
@@ -26,43 +116,138 @@ class RAGRetriever:
                 query, k=self.config.k
             )
             
-            filtered_results = self._filter_by_doc_types(results, doc_types)
-            
-            relevant_docs = self._filter_by_relevance(filtered_results)
-            
-            diverse_docs = self._ensure_diversity(relevant_docs)
-            
-            context = self._build_context_string(diverse_docs)
-            
-            return {
-                "context": context,
-                "source_docs": diverse_docs,
-                "total_retrieved": len(results),
-                "after_filtering": len(relevant_docs),
-                "final_count": len(diverse_docs),
-                "doc_type_distribution": self._get_source_distribution(diverse_docs)
-            }
+            return self._process_results(results, doc_types)
             
         except Exception as e:
             logger.error(f"Error during retrieval: {e}")
-            return {
-                "context": "",
-                "source_docs": [],
-                "total_retrieved": 0,
-                "after_filtering": 0,
-                "final_count": 0,
-                "doc_type_distribution": {}
-            }
+            return self._empty_result()
+    
+    def retrieve_context_batch(self, queries: List[str], doc_types: Collection[str] = None) -> List[Dict[str, Any]]:
+        """Retrieve context for several queries with one embedding call and one index search"""
+        queries = [query for query in queries if query]
+        if not queries:
+            return []
+        
+        try:
+            batch_results = self._search_batch(queries)
+        except Exception as e:
+            logger.error(f"Error during batch retrieval: {e}")
+            return [self._empty_result() for _ in queries]
+        
+        return [self._process_results(results, doc_types) for results in batch_results]
+    
+    def _search_batch(self, queries: List[str]) -> List[List[Tuple[Document, float]]]:
+        index = getattr(self.vector_store, "index", None)
+        embeddings = self.vector_store.embeddings if index is not None else None
+        
+        # Stores without a raw FAISS index or embeddings object fall back to one search per query
+        if embeddings is None:
+            return [
+                self.vector_store.similarity_search_with_score(query, k=self.config.k)
+                for query in queries
+            ]
+        
+        query_vectors = self._embed_queries(embeddings, queries)
+        distances, indices = index.search(query_vectors, self.config.k)
+        
+        docstore = self.vector_store.docstore
+        index_to_docstore_id = self.vector_store.index_to_docstore_id
+        
+        return [
+            [
+                (docstore.search(index_to_docstore_id[i]), float(score))
+                for score, i in zip(row_distances, row_indices)
+                if i != -1
+            ]
+            for row_distances, row_indices in zip(distances, indices)
+        ]
+    
+    def _embed_queries(self, embeddings, queries: List[str]) -> np.ndarray:
+        """Embed queries, reusing vectors for the repeated section/JD/superset query strings"""
+        with self._cache_lock:
+            vectors = {query: self._query_vectors[query] for query in queries if query in self._query_vectors}
+        
+        # Embed outside the lock so concurrent retrievals don't serialize on the API call
+        missing = list(dict.fromkeys(query for query in queries if query not in vectors))
+        if missing:
+            new_vectors = dict(zip(missing, np.asarray(embeddings.embed_documents(missing), dtype=np.float32)))
+            with self._cache_lock:
+                if len(self._query_vectors) + len(new_vectors) <= QUERY_VECTOR_CACHE_SIZE:
+                    self._query_vectors.update(new_vectors)
+            vectors.update(new_vectors)
+        
+        return np.stack([vectors[query] for query in queries])
+    
+    def _dedupe_queries(self, queries: List[str]) -> List[str]:
+        """Drop queries whose embedding is within query_dedup_threshold cosine of an earlier query"""
+        queries = list(dict.fromkeys(query for query in queries if query))
+        index = getattr(self.vector_store, "index", None)
+        embeddings = getattr(self.vector_store, "embeddings", None) if index is not None else None
+        if embeddings is None or len(queries) <= 1:
+            return queries
+        
+        # Reuses the query vector cache, so the batch search that follows embeds nothing new
+        try:
+            vectors = self._embed_queries(embeddings, queries)
+        except Exception as e:
+            # Keep every query; the guarded batch retrieval reports the failure
+            logger.warning(f"Could not embed queries for deduplication: {e}")
+            return queries
+        
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1.0, norms)
+        similarities = vectors @ vectors.T
+        
+        kept = [0]
+        for i in range(1, len(queries)):
+            if np.max(similarities[kept, i]) < self.config.query_dedup_threshold:
+                kept.append(i)
+        
+        return [queries[i] for i in kept]
+    
+    def _process_results(self, results: List[Tuple[Document, float]], 
+                         doc_types: Collection[str] = None) -> Dict[str, Any]:
+        filtered_results = self._filter_by_doc_types(results, doc_types)
+        
+        relevant_docs = self._filter_by_relevance(filtered_results)
+        
+        diverse_docs = self._ensure_diversity(relevant_docs)
+        
+        context = self._build_context_string(diverse_docs)
+        
+        return {
+            "context": context,
+            "source_docs": diverse_docs,
+            "total_retrieved": len(results),
+            "after_filtering": len(relevant_docs),
+            "final_count": len(diverse_docs),
+            "doc_type_distribution": self._get_source_distribution(diverse_docs)
+        }
+    
+    def _empty_result(self) -> Dict[str, Any]:
+        return {
+            "context": "",
+            "source_docs": [],
+            "total_retrieved": 0,
+            "after_filtering": 0,
+            "final_count": 0,
+            "doc_type_distribution": {}
+        }
     
     def _filter_by_doc_types(self, results: List[Tuple[Document, float]], 
-                            doc_types: List[str] = None) -> List[Tuple[Document, float]]:
+                            doc_types: Collection[str] = None) -> List[Tuple[Document, float]]:
         if not doc_types:
             return results
         
+        doc_types_lc = [doc_type.lower() for doc_type in doc_types]
+        
         filtered = []
         for doc, score in results:
-            source = doc.metadata.get("source", "")
-            if any(doc_type.lower() in source.lower() for doc_type in doc_types):
+            # source_lc is stamped at ingest; older stores only carry "source"
+            source = doc.metadata.get("source_lc")
+            if source is None:
+                source = doc.metadata.get("source", "").lower()
+            if any(doc_type in source for doc_type in doc_types_lc):
                 filtered.append((doc, score))
         
         return filtered
@@ -71,12 +256,10 @@ class RAGRetriever:
         if not results:
             return results
         
-        max_score = max(score for _, score in results)
-        threshold_score = max_score * self.config.score_threshold
+        scores = np.fromiter((score for _, score in results), dtype=np.float64, count=len(results))
+        threshold_score = scores.max() * self.config.score_threshold
         
-        relevant = [(doc, score) for doc, score in results if score >= threshold_score]
-        
-        return relevant[:self.config.k]
+        return [results[i] for i in np.flatnonzero(scores >= threshold_score)[:self.config.k]]
     
     def _ensure_diversity(self, results: List[Tuple[Document, float]]) -> List[Tuple[Document, float]]:
         if len(results) <= 1:
@@ -86,74 +269,87 @@ class RAGRetriever:
         used_content_hashes = set()
         
         for doc, score in results:
-            content_hash = hash(doc.page_content[:100])
+            content_hash = content_fingerprint(doc.page_content)
             
             if content_hash not in used_content_hashes:
                 diverse_docs.append((doc, score))
                 used_content_hashes.add(content_hash)
         
-        return diverse_docs
+        return self._drop_near_duplicates(diverse_docs)
+    
+    def _drop_near_duplicates(self, results: List[Tuple[Document, float]]) -> List[Tuple[Document, float]]:
+        """Greedy MMR-style pass: keep a doc only if its cosine to every kept doc is below diversity_threshold"""
+        vectors = self._get_doc_vectors([doc for doc, _ in results])
+        if vectors is None or len(results) <= 1:
+            return results
+        
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1.0, norms)
+        
+        kept = [0]
+        for i in range(1, len(results)):
+            if np.max(vectors[kept] @ vectors[i]) < self.config.diversity_threshold:
+                kept.append(i)
+        
+        return [results[i] for i in kept]
+    
+    def _get_doc_vectors(self, docs: List[Document]) -> Optional[np.ndarray]:
+        """Stored vectors for docs from the FAISS index, or None if they can't be recovered"""
+        index = getattr(self.vector_store, "index", None)
+        if index is None:
+            return None
+        
+        index_to_docstore_id = self.vector_store.index_to_docstore_id
+        with self._cache_lock:
+            if len(self._docstore_positions) != len(index_to_docstore_id):
+                self._docstore_positions = {doc_id: i for i, doc_id in index_to_docstore_id.items()}
+            docstore_positions = self._docstore_positions
+        
+        positions = [docstore_positions.get(getattr(doc, "id", None)) for doc in docs]
+        if None in positions:
+            return None
+        
+        try:
+            return np.asarray(index.reconstruct_batch(np.asarray(positions, dtype=np.int64)), dtype=np.float32)
+        except RuntimeError as e:
+            logger.warning(f"Index does not support vector reconstruction: {e}")
+            return None
     
     def _build_context_string(self, docs_with_scores: List[Tuple[Document, float]]) -> str:
-        context_parts = []
-        current_length = 0
+        buffer = io.StringIO()
+        written = 0
+        separator = ""
         
         for doc, score in docs_with_scores:
             source = doc.metadata.get("source", "unknown")
-            chunk_info = f"(Source: {source})"
             
-            doc_text = f"{chunk_info}\n{doc.page_content}\n"
+            # Size the part before materializing it so over-budget docs are never built
+            part_length = len(separator) + len(source) + len(doc.page_content) + _CONTEXT_PART_OVERHEAD
             
-            if current_length + len(doc_text) > self.config.max_context_length:
-                if current_length == 0:
-                    truncated = doc_text[:self.config.max_context_length - 100] + "...[truncated]"
-                    context_parts.append(truncated)
+            if written + part_length > self.config.max_context_length:
+                if written == 0:
+                    doc_text = f"(Source: {source})\n{doc.page_content}\n"
+                    buffer.write(doc_text[:self.config.max_context_length - 100] + "...[truncated]")
                 break
             
-            context_parts.append(doc_text)
-            current_length += len(doc_text)
+            buffer.write(separator)
+            buffer.write(f"(Source: {source})\n{doc.page_content}\n")
+            written += part_length
+            separator = _CONTEXT_SEPARATOR
         
-        return "\n---\n".join(context_parts)
+        return buffer.getvalue()
     
-    def _get_source_distribution(self, docs_with_scores: List[Tuple[Document, float]]) -> Dict[str, int]:
-        distribution = {}
-        for doc, _ in docs_with_scores:
-            source = doc.metadata.get("source", "unknown")
-            distribution[source] = distribution.get(source, 0) + 1
-        return distribution
+    def _get_source_distribution(self, docs_with_scores: List[Tuple[Document, float]]) -> Counter[str]:
+        return Counter(doc.metadata.get("source", "unknown") for doc, _ in docs_with_scores)
     
     def get_targeted_context(self, section_type: str, specific_query: str = None) -> Dict[str, Any]:
-        section_queries = {
-            "career_summary": [
-                "professional summary career objective",
-                "years experience achievements accomplishments",
-                "leadership management skills expertise"
-            ],
-            "experience": [
-                "work experience employment history",
-                "job responsibilities achievements results",
-                "projects accomplishments impact metrics"
-            ],
-            "skills": [
-                "technical skills competencies",
-                "software tools technologies",
-                "certifications qualifications expertise"
-            ],
-            "cover_letter": [
-                "job requirements qualifications",
-                "company culture values mission",
-                "relevant experience achievements match"
-            ]
-        }
-        
-        queries = section_queries.get(section_type, [specific_query]) if specific_query else section_queries.get(section_type, [])
+        queries = self._dedupe_queries(
+            self._SECTION_QUERIES.get(section_type, (specific_query,) if specific_query else ())
+        )
         
         all_results = []
-        for query in queries:
-            if query:
-                result = self.retrieve_context(query)
-                if result["source_docs"]:
-                    all_results.extend(result["source_docs"])
+        for result in self.retrieve_context_batch(queries):
+            all_results.extend(result["source_docs"])
         
         unique_results = self._ensure_diversity(all_results)
         
@@ -168,18 +364,11 @@ class RAGRetriever:
         }
     
     def get_jd_specific_context(self, focus_areas: List[str] = None) -> Dict[str, Any]:
-        jd_queries = focus_areas or [
-            "job requirements qualifications must have",
-            "responsibilities duties role expectations",
-            "skills experience needed preferred",
-            "company culture values team environment"
-        ]
+        jd_queries = self._dedupe_queries(focus_areas or self._DEFAULT_JD_QUERIES)
         
         all_docs = []
-        for query in jd_queries:
-            result = self.retrieve_context(query, doc_types=["job_description"])
-            if result["source_docs"]:
-                all_docs.extend(result["source_docs"])
+        for result in self.retrieve_context_batch(jd_queries, doc_types=self._JD_DOC_TYPES):
+            all_docs.extend(result["source_docs"])
         
         unique_docs = self._ensure_diversity(all_docs)
         context = self._build_context_string(unique_docs)
@@ -192,17 +381,13 @@ class RAGRetriever:
         }
     
     def get_superset_context(self, skill_focus: str = None) -> Dict[str, Any]:
-        superset_queries = [
-            skill_focus or "technical skills experience achievements",
-            "projects accomplishments certifications",
-            "leadership management experience results"
-        ]
+        superset_queries = self._dedupe_queries(
+            [skill_focus or self._DEFAULT_SKILL_FOCUS_QUERY, *self._SUPERSET_QUERIES]
+        )
         
         all_docs = []
-        for query in superset_queries:
-            result = self.retrieve_context(query, doc_types=["experience_superset", "skills_superset", "superset", "experience_summary"])
-            if result["source_docs"]:
-                all_docs.extend(result["source_docs"])
+        for result in self.retrieve_context_batch(superset_queries, doc_types=self._SUPERSET_DOC_TYPES):
+            all_docs.extend(result["source_docs"])
         
         unique_docs = self._ensure_diversity(all_docs)
         context = self._build_context_string(unique_docs)
@@ -219,9 +404,14 @@ class ContextBuilder:
         self.retriever = retriever
     
     def build_cv_generation_context(self) -> str:
-        jd_context = self.retriever.get_jd_specific_context()
-        superset_context = self.retriever.get_superset_context()
-        
+        # JD and superset retrievals are independent; run them side by side.
+        # Plain threads rather than asyncio.run, which fails inside an already running event loop.
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            jd_future = executor.submit(self.retriever.get_jd_specific_context)
+            superset_future = executor.submit(self.retriever.get_superset_context)
+            return self._combine_cv_contexts(jd_future.result(), superset_future.result())
+    
+    def _combine_cv_contexts(self, jd_context: Dict[str, Any], superset_context: Dict[str, Any]) -> str:
         combined_context = f"""
 JOB DESCRIPTION ANALYSIS:
 {jd_context['context']}
@@ -1,16 +1,105 @@
 import os
+import re
 import json
 import logging
+import functools
 from typing import Dict, Any, List, Optional
 from dataclasses import dataclass, asdict
 
 import streamlit as st
-from openai import OpenAI
+from openai import OpenAI, BadRequestError
 
 from models.cv_data import CVData, ContactInfo, RoleExperience, ExperienceBullet
 
+try:
+    import orjson
+except ImportError:  # optional speedup; the stdlib parser yields the same objects
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
+_PARSING_SYSTEM_PROMPT = """You are an expert CV parser. Your task is to extract structured information from CV text and return it as valid JSON.
+
+You must extract and structure ALL the information from the CV into the exact JSON format specified. Pay special attention to:
+- Contact information (name, email, phone, location, linkedin, website)
+- Professional summary/objective
+- Complete work experience with achievements
+- Skills and competencies
+- Any additional sections (education, certifications, etc.)
+
+CRITICAL FORMATTING REQUIREMENTS:
+- Return ONLY valid JSON, no markdown code blocks, no explanations
+- Use double quotes for all strings
+- Properly escape special characters
+- Each experience entry should have detailed achievement bullets
+- Extract dates, locations, and company information accurately
+- Professional summary should be concise but comprehensive
+
+The output must match the CVData structure exactly."""
+
+@functools.lru_cache(maxsize=None)
+def _get_openai_client() -> OpenAI:
+    """Process-wide OpenAI client, created on first use so importing needs no API key"""
+    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+# Optional leading ```json / ``` fence, optional trailing ``` fence, surrounding whitespace
+_FENCE_RE = re.compile(r'^\s*(?:```(?:json)?)?\s*(.*?)\s*(?:```)?\s*$', re.DOTALL)
+
+def _loads_json(text: str) -> Any:
+    """Parse JSON text with orjson when available, falling back to the stdlib"""
+    if orjson is not None:
+        return orjson.loads(text.encode('utf-8'))
+    return json.loads(text)
+
+_NULLABLE_STRING = {"type": ["string", "null"]}
+_STRING_LIST = {"type": "array", "items": {"type": "string"}}
+
+# Mirrors the shape produced by SampleCVParser._validate_cv_structure
+SAMPLE_CV_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "contact": {
+            "type": "object",
+            "properties": {
+                "name": {"type": "string"},
+                "email": {"type": "string"},
+                "phone": {"type": "string"},
+                "location": {"type": "string"},
+                "linkedin": _NULLABLE_STRING,
+                "website": _NULLABLE_STRING
+            },
+            "required": ["name", "email", "phone", "location", "linkedin", "website"],
+            "additionalProperties": False
+        },
+        "professional_summary": {"type": "string"},
+        "skills": _STRING_LIST,
+        "experience": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "company": {"type": "string"},
+                    "position": {"type": "string"},
+                    "location": {"type": "string"},
+                    "start_date": {"type": "string"},
+                    "end_date": {"type": "string"},
+                    "duration": {"type": "string"},
+                    "achievements": _STRING_LIST
+                },
+                "required": ["company", "position", "location", "start_date", "end_date", "duration", "achievements"],
+                "additionalProperties": False
+            }
+        }
+    },
+    "required": ["contact", "professional_summary", "skills", "experience"],
+    "additionalProperties": False
+}
+
+SAMPLE_CV_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "sample_cv", "schema": SAMPLE_CV_SCHEMA, "strict": True}
+}
+
 @dataclass
 class SampleCVParseConfig:
     temperature: float = 0.1
@@ -27,7 +116,7 @@ class SampleCVParseConfig:
 class SampleCVParser:
     def __init__(self, config: SampleCVParseConfig = None):
         self.config = config or SampleCVParseConfig()
-        self.openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.openai_client = _get_openai_client()
     
     def _get_model_compatible_params(self, model: str, max_tokens: int) -> Dict[str, Any]:
         """Get model-compatible parameters for OpenAI API calls"""
@@ -52,7 +141,7 @@ class SampleCVParser:
             # Get model-compatible parameters
             token_params = self._get_model_compatible_params(self.config.model, self.config.max_tokens)
             
-            response = self.openai_client.chat.completions.create(
+            request_params = dict(
                 model=self.config.model,
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -62,8 +151,22 @@ class SampleCVParser:
                 **token_params
             )
             
-            raw_response = response.choices[0].message.content.strip()
-            parsed_data = self._process_llm_response(raw_response)
+            structured = None
+            try:
+                response = self.openai_client.chat.completions.create(
+                    response_format=SAMPLE_CV_RESPONSE_FORMAT, **request_params
+                )
+                structured = self._read_structured_response(response)
+            except BadRequestError as e:
+                # Models without structured-output support reject response_format
+                logger.warning(f"Structured output unavailable, falling back to free-form JSON: {e}")
+            
+            if structured is None:
+                response = self.openai_client.chat.completions.create(**request_params)
+                raw_response = (response.choices[0].message.content or "").strip()
+                parsed_data = self._process_llm_response(raw_response)
+            else:
+                raw_response, parsed_data = structured
             
             return {
                 "cv_data": parsed_data,
@@ -82,24 +185,7 @@ class SampleCVParser:
             }
     
     def _create_parsing_system_prompt(self) -> str:
-        return """You are an expert CV parser. Your task is to extract structured information from CV text and return it as valid JSON.
-
-You must extract and structure ALL the information from the CV into the exact JSON format specified. Pay special attention to:
-- Contact information (name, email, phone, location, linkedin, website)
-- Professional summary/objective
-- Complete work experience with achievements
-- Skills and competencies
-- Any additional sections (education, certifications, etc.)
-
-CRITICAL FORMATTING REQUIREMENTS:
-- Return ONLY valid JSON, no markdown code blocks, no explanations
-- Use double quotes for all strings
-- Properly escape special characters
-- Each experience entry should have detailed achievement bullets
-- Extract dates, locations, and company information accurately
-- Professional summary should be concise but comprehensive
-
-The output must match the CVData structure exactly."""
+        return _PARSING_SYSTEM_PROMPT
     
     def _create_parsing_user_prompt(self, sample_cv_text: str) -> str:
         return f"""Parse the following CV text and extract ALL information into the exact JSON structure below.
@@ -151,27 +237,44 @@ PARSING INSTRUCTIONS:
 
 Return ONLY the JSON object with all extracted information."""
     
+    def _read_structured_response(self, response) -> Optional[tuple]:
+        """Return (raw text, validated CV data) from a schema-constrained reply, or None to use the free-form path"""
+        choice = response.choices[0]
+        
+        # Refusals carry no content and replies cut off at max_tokens are truncated JSON
+        if choice.message.refusal or choice.finish_reason == "length" or not choice.message.content:
+            logger.warning(f"Structured output incomplete (finish_reason={choice.finish_reason}), falling back to free-form JSON")
+            return None
+        
+        raw_response = choice.message.content.strip()
+        try:
+            parsed_data = _loads_json(raw_response)
+        except ValueError as e:  # json and orjson decode errors both subclass ValueError
+            logger.warning(f"Structured output did not decode, falling back to free-form JSON: {e}")
+            return None
+        
+        if not isinstance(parsed_data, dict):
+            logger.warning("Structured output is not a JSON object, falling back to free-form JSON")
+            return None
+        
+        return raw_response, self._validate_cv_structure(parsed_data)
+    
     def _process_llm_response(self, raw_response: str) -> Dict[str, Any]:
         """Process and validate the LLM response"""
         
         # Clean the response - remove common prefixes/suffixes and markdown formatting
-        clean_response = raw_response.strip()
-        if clean_response.startswith("```json"):
-            clean_response = clean_response[7:]
-        if clean_response.endswith("```"):
-            clean_response = clean_response[:-3]
-        clean_response = clean_response.strip()
+        clean_response = _FENCE_RE.match(raw_response).group(1)
         
         try:
             # Parse JSON
-            parsed_data = json.loads(clean_response)
+            parsed_data = _loads_json(clean_response)
             
             # Validate and clean the structure
             validated_data = self._validate_cv_structure(parsed_data)
             
             return validated_data
             
-        except json.JSONDecodeError as e:
+        except ValueError as e:  # json and orjson decode errors both subclass ValueError
             logger.error(f"JSON parsing failed: {e}")
             return self._get_empty_cv_structure()
     
@@ -1,13 +1,36 @@
 import os
+import re
 import logging
-from typing import List, Dict, Any, Optional
+import functools
+from typing import List, Dict, Any, Optional, Iterable, Iterator
 from dataclasses import dataclass
 
 import streamlit as st
-from openai import OpenAI
+from openai import OpenAI, BadRequestError
 
 logger = logging.getLogger(__name__)
 
+# Leading bullets ("•", "-", "*") and list numbering ("1.", "10)") on a skill line
+_SKILL_PREFIX_RE = re.compile(r'^(?:[•\-\*]\s*)*(?:\d+[.)]\s*)?')
+
+_SKILLS_SYSTEM_PROMPT = """You are an expert CV writer and ATS optimizer specializing in senior engineering roles.
+
+Your ONLY task is to generate exactly 10 skills for a CV that will pass both ATS scanning and human review.
+
+CRITICAL RULES:
+- Output ONLY the 10 skills, one per line
+- No numbering, no bullets, no extra text, no explanations
+- Each skill must be ≤ 2 words in Title Case
+- Skills must be derived from job description language
+- Skills must be supported by candidate's experience
+- Order by priority (most important first)
+- No duplicates or near-duplicates"""
+
+@functools.lru_cache(maxsize=None)
+def _get_openai_client() -> OpenAI:
+    """Process-wide OpenAI client, created on first use so importing needs no API key"""
+    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
 @dataclass
 class SkillsGenerationConfig:
     max_skills: int = 10
@@ -23,10 +46,24 @@ class SkillsGenerationConfig:
             return 1.0
         return self.temperature
 
+def _iter_lines(stream: Iterable[Any]) -> Iterator[str]:
+    """Yield complete lines from a streamed chat completion as they arrive"""
+    buffer = ""
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            buffer += delta
+            *lines, buffer = buffer.split('\n')
+            yield from lines
+    if buffer:
+        yield buffer
+
 class SkillsGenerator:
     def __init__(self, config: SkillsGenerationConfig = None):
         self.config = config or SkillsGenerationConfig()
-        self.openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.openai_client = _get_openai_client()
     
     def _get_model_compatible_params(self, model: str, max_tokens: int) -> Dict[str, Any]:
         """Get model-compatible parameters for OpenAI API calls"""
@@ -52,7 +89,7 @@ class SkillsGenerator:
             # Get model-compatible parameters
             token_params = self._get_model_compatible_params(self.config.model, self.config.max_tokens)
             
-            response = self.openai_client.chat.completions.create(
+            request_params = dict(
                 model=self.config.model,
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -62,7 +99,14 @@ class SkillsGenerator:
                 **token_params
             )
             
-            raw_skills = response.choices[0].message.content.strip()
+            try:
+                raw_skills = self._stream_skills_response(request_params)
+            except BadRequestError as e:
+                # Some models/organizations reject streamed completions
+                logger.warning(f"Streaming unavailable, falling back to a single completion: {e}")
+                response = self.openai_client.chat.completions.create(**request_params)
+                raw_skills = response.choices[0].message.content.strip()
+            
             processed_skills = self._process_skills_response(raw_skills)
             
             return {
@@ -83,19 +127,27 @@ class SkillsGenerator:
                 "validation_message": f"Error generating skills: {str(e)}"
             }
     
+    def _stream_skills_response(self, request_params: Dict[str, Any]) -> str:
+        """Stream the completion and stop generation once max_skills distinct skills have arrived"""
+        stream = self.openai_client.chat.completions.create(stream=True, **request_params)
+        raw_lines = []
+        seen = set()
+        try:
+            for line in _iter_lines(stream):
+                raw_lines.append(line)
+                skill = self._clean_skill_line(line)
+                if skill:
+                    seen.add(skill)
+                    if len(seen) >= self.config.max_skills:
+                        break
+        finally:
+            # Closing the connection early cancels the remaining server-side decoding
+            stream.close()
+        
+        return '\n'.join(raw_lines).strip()
+    
     def _create_skills_system_prompt(self) -> str:
-        return """You are an expert CV writer and ATS optimizer specializing in senior engineering roles.
-
-Your ONLY task is to generate exactly 10 skills for a CV that will pass both ATS scanning and human review.
-
-CRITICAL RULES:
-- Output ONLY the 10 skills, one per line
-- No numbering, no bullets, no extra text, no explanations
-- Each skill must be ≤ 2 words in Title Case
-- Skills must be derived from job description language
-- Skills must be supported by candidate's experience
-- Order by priority (most important first)
-- No duplicates or near-duplicates"""
+        return _SKILLS_SYSTEM_PROMPT
     
     def _create_skills_user_prompt(self, job_description: str, candidate_background: str) -> str:
         return f"""ANALYZE the job description and candidate background to generate EXACTLY 10 skills.
@@ -131,21 +183,12 @@ OUTPUT FORMAT:
         
         # Filter out any numbered items, bullets, or explanatory text
         skills = []
+        seen = set()
         for line in lines:
-            # Remove common prefixes
-            clean_line = line
-            prefixes = ['•', '-', '*', '1.', '2.', '3.', '4.', '5.', '6.', '7.', '8.', '9.', '10.']
-            for prefix in prefixes:
-                if clean_line.startswith(prefix):
-                    clean_line = clean_line[len(prefix):].strip()
-            
-            # Check if it's a valid skill (≤2 words, not explanatory text)
-            words = clean_line.split()
-            if len(words) <= self.config.max_words_per_skill and len(words) > 0:
-                # Convert to title case
-                skill = ' '.join(word.capitalize() for word in words)
-                if skill not in skills:  # Avoid duplicates
-                    skills.append(skill)
+            skill = self._clean_skill_line(line)
+            if skill and skill not in seen:  # Avoid duplicates
+                seen.add(skill)
+                skills.append(skill)
                     
             # Stop at 10 skills
             if len(skills) >= self.config.max_skills:
@@ -164,6 +207,22 @@ OUTPUT FORMAT:
             "message": message
         }
     
+    def _clean_skill_line(self, line: str) -> Optional[str]:
+        """Normalize one response line to a Title Case skill, or None if it is not a valid skill"""
+        # Remove common prefixes
+        clean_line = _SKILL_PREFIX_RE.sub('', line.strip(), count=1)
+        
+        # Check if it's a valid skill (≤2 words, not explanatory text)
+        words = clean_line.split()
+        if not 0 < len(words) <= self.config.max_words_per_skill:
+            return None
+        
+        # Convert to title case; str.title() matches capitalize() only for purely alphabetic words
+        skill = ' '.join(words)
+        if skill.replace(' ', '').isalpha():
+            return skill.title()
+        return ' '.join(word.capitalize() for word in words)
+    
     def format_skills_for_cv(self, skills: List[str], format_style: str = "bullet") -> str:
         """Format skills for CV display"""
         if not skills:
@@ -1,13 +1,76 @@
 import json
 import re
 import logging
-from typing import Dict, Any, List, Optional
-from dataclasses import dataclass, asdict
+from collections import Counter
+from typing import Dict, Any, List, Optional, Tuple
+from dataclasses import dataclass, asdict, replace
 
 import streamlit as st
 
+try:
+    import orjson
+except ImportError:  # optional speedup; the stdlib json module writes the same document
+    orjson = None
+
+try:
+    import ahocorasick
+except ImportError:  # optional speedup; falls back to per-section substring checks
+    ahocorasick = None
+
 logger = logging.getLogger(__name__)
 
+_COMMON_SECTIONS = (
+    "CONTACT", "SUMMARY", "CAREER SUMMARY", "PROFESSIONAL SUMMARY",
+    "SKILLS", "TECHNICAL SKILLS", "CORE COMPETENCIES",
+    "EXPERIENCE", "WORK EXPERIENCE", "PROFESSIONAL EXPERIENCE",
+    "EDUCATION", "ACADEMIC BACKGROUND", "QUALIFICATIONS",
+    "CERTIFICATIONS", "PROJECTS", "ACHIEVEMENTS"
+)
+
+_MAX_SECTIONS = 5
+
+def _build_section_automaton():
+    """Aho-Corasick automaton mapping each section name to its priority index"""
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for index, section in enumerate(_COMMON_SECTIONS):
+        automaton.add_word(section, index)
+    automaton.make_automaton()
+    return automaton
+
+_SECTION_AUTOMATON = _build_section_automaton()
+
+def _find_sections(line_upper: str) -> List[str]:
+    """Section names contained in an upper-cased line, in _COMMON_SECTIONS order"""
+    if _SECTION_AUTOMATON is None:
+        return [section for section in _COMMON_SECTIONS if section in line_upper]
+    return [_COMMON_SECTIONS[index] for index in sorted({index for _, index in _SECTION_AUTOMATON.iter(line_upper)})]
+
+# Date range formats in priority order
+_DATE_PATTERNS = (
+    ("MM/YYYY - MM/YYYY", re.compile(r'\d{1,2}/\d{4}\s*-\s*\d{1,2}/\d{4}')),
+    ("Mon YYYY - Mon YYYY", re.compile(r'[A-Za-z]{3,9}\s+\d{4}\s*-\s*[A-Za-z]{3,9}\s+\d{4}')),
+    ("YYYY-YYYY", re.compile(r'\d{4}\s*-\s*\d{4}')),
+    ("MM.YYYY - MM.YYYY", re.compile(r'\d{1,2}\.\d{4}\s*-\s*\d{1,2}\.\d{4}'))
+)
+
+# Line-leading bullets ("-" and "*" need a space and trailing text after them) or any of the
+# date formats, kept within a single line, so both are found in one scan of the raw text
+_BULLET_OR_DATE_RE = re.compile(
+    r'^[^\S\n]*(?:(?P<b>[•○→▪])|(?P<spaced>[-*])[^\S\n]+(?=\S))'
+    r'|(?P<date>'
+    r'\d{1,2}/\d{4}[^\S\n]*-[^\S\n]*\d{1,2}/\d{4}'
+    r'|[A-Za-z]{3,9}[^\S\n]+\d{4}[^\S\n]*-[^\S\n]*[A-Za-z]{3,9}[^\S\n]+\d{4}'
+    r'|\d{4}[^\S\n]*-[^\S\n]*\d{4}'
+    r'|\d{1,2}\.\d{4}[^\S\n]*-[^\S\n]*\d{1,2}\.\d{4}'
+    r')',
+    re.MULTILINE
+)
+
+_PHONE_RE = re.compile(r'\d{3}[-.\s]?\d{3}[-.\s]?\d{4}')
+_EMPH_STAR_RE = re.compile(r'\*[^*\n]+\*')
+
 @dataclass
 class StyleProfile:
     section_order: List[str]
@@ -21,38 +84,100 @@ class StyleProfile:
     line_spacing: str
     emphasis_markers: List[str]
 
+_DEFAULT_PROFILE = StyleProfile(
+    section_order=["Contact", "Career Summary", "Skills", "Experience", "Education"],
+    bullet_style="•",
+    spacing_pattern="single_line",
+    heading_format="ALL_CAPS",
+    contact_format="horizontal",
+    date_format="MM/YYYY - MM/YYYY",
+    font_style="professional",
+    margins={"top": "1in", "bottom": "1in", "left": "0.75in", "right": "0.75in"},
+    line_spacing="1.15",
+    emphasis_markers=["**", "*", "**bold**"]
+)
+
+def _copy_profile(profile: StyleProfile) -> StyleProfile:
+    """Copy a profile with its own lists and dict, so edits never reach the shared default"""
+    return replace(
+        profile,
+        section_order=list(profile.section_order),
+        margins=dict(profile.margins),
+        emphasis_markers=list(profile.emphasis_markers)
+    )
+
 class StyleExtractor:
     def __init__(self):
-        self.default_profile = StyleProfile(
-            section_order=["Contact", "Career Summary", "Skills", "Experience", "Education"],
-            bullet_style="•",
-            spacing_pattern="single_line",
-            heading_format="ALL_CAPS",
-            contact_format="horizontal",
-            date_format="MM/YYYY - MM/YYYY",
-            font_style="professional",
-            margins={"top": "1in", "bottom": "1in", "left": "0.75in", "right": "0.75in"},
-            line_spacing="1.15",
-            emphasis_markers=["**", "*", "**bold**"]
-        )
+        self.default_profile = _copy_profile(_DEFAULT_PROFILE)
     
     def extract_style_from_text(self, sample_cv_text: str) -> StyleProfile:
         try:
-            profile = self._analyze_structure(sample_cv_text)
+            profile = cached_style_profile(sample_cv_text)
             return profile
         except Exception as e:
             logger.error(f"Error extracting style: {e}")
-            return self.default_profile
+            return _copy_profile(self.default_profile)
     
     def _analyze_structure(self, text: str) -> StyleProfile:
         lines = [line.strip() for line in text.split('\n') if line.strip()]
         
-        section_order = self._extract_section_order(lines)
-        bullet_style = self._detect_bullet_style(lines)
-        heading_format = self._detect_heading_format(lines)
-        contact_format = self._detect_contact_format(lines)
-        date_format = self._detect_date_format(lines)
-        emphasis_markers = self._detect_emphasis_markers(lines)
+        # Single pass over the lines for every per-line signal
+        found_sections = {}
+        all_caps_headings = 0
+        title_case_headings = 0
+        uppercase_emphasis = False
+        inline_contact = False
+        email_line = -1
+        phone_line = -1
+        
+        for i, line in enumerate(lines):
+            # Only the first 5 sections are kept, so stop matching headers once they are found
+            if len(found_sections) < _MAX_SECTIONS:
+                for section in _find_sections(line.upper()):
+                    found_sections.setdefault(section, None)
+            
+            is_upper = line.isupper()
+            is_title = line.istitle()
+            has_email = i < 10 and '@' in line
+            # Word counts only matter for heading-like and contact lines; skip the split for body text
+            word_count = len(line.split()) if is_upper or is_title or has_email else 0
+            
+            if is_upper and len(line) < 50:
+                all_caps_headings += 1
+            if is_title and word_count <= 4:
+                title_case_headings += 1
+            if is_upper and word_count <= 6:
+                uppercase_emphasis = True
+            
+            if i < 10:
+                if has_email:
+                    email_line = i
+                    if '|' in line or '•' in line or word_count > 4:
+                        inline_contact = True
+                if _PHONE_RE.search(line):
+                    phone_line = i
+        
+        section_order = list(found_sections)[:_MAX_SECTIONS] or list(self.default_profile.section_order)
+        
+        if all_caps_headings <= 2 and title_case_headings > 2:
+            heading_format = "Title_Case"
+        else:
+            heading_format = "ALL_CAPS"
+        
+        if not inline_contact and email_line != -1 and phone_line != -1 and abs(email_line - phone_line) <= 2:
+            contact_format = "vertical"
+        else:
+            contact_format = "horizontal"
+        
+        bullet_style, date_format = self._scan_bullets_and_dates(text)
+        
+        emphasis_markers = []
+        if '**' in text:
+            emphasis_markers.append('**')
+        if _EMPH_STAR_RE.search(text):
+            emphasis_markers.append('*')
+        if uppercase_emphasis:
+            emphasis_markers.append('UPPERCASE')
         
         return StyleProfile(
             section_order=section_order,
@@ -62,129 +187,60 @@ class StyleExtractor:
             contact_format=contact_format,
             date_format=date_format,
             font_style="professional",
-            margins=self.default_profile.margins,
+            margins=dict(self.default_profile.margins),
             line_spacing="1.15",
-            emphasis_markers=emphasis_markers
+            emphasis_markers=emphasis_markers or ["**"]
         )
     
-    def _extract_section_order(self, lines: List[str]) -> List[str]:
-        common_sections = [
-            "CONTACT", "SUMMARY", "CAREER SUMMARY", "PROFESSIONAL SUMMARY",
-            "SKILLS", "TECHNICAL SKILLS", "CORE COMPETENCIES",
-            "EXPERIENCE", "WORK EXPERIENCE", "PROFESSIONAL EXPERIENCE",
-            "EDUCATION", "ACADEMIC BACKGROUND", "QUALIFICATIONS",
-            "CERTIFICATIONS", "PROJECTS", "ACHIEVEMENTS"
-        ]
-        
-        found_sections = []
-        for line in lines:
-            line_upper = line.upper()
-            for section in common_sections:
-                if section in line_upper and section not in found_sections:
-                    found_sections.append(section)
-        
-        if not found_sections:
-            return self.default_profile.section_order
-        
-        return found_sections[:5]
-    
-    def _detect_bullet_style(self, lines: List[str]) -> str:
-        bullet_patterns = {
-            '•': r'^\s*•',
-            '○': r'^\s*○',
-            '-': r'^\s*-\s',
-            '*': r'^\s*\*\s',
-            '→': r'^\s*→',
-            '▪': r'^\s*▪'
-        }
-        
-        bullet_counts = {}
-        for line in lines:
-            for bullet, pattern in bullet_patterns.items():
-                if re.match(pattern, line):
-                    bullet_counts[bullet] = bullet_counts.get(bullet, 0) + 1
+    def _scan_bullets_and_dates(self, text: str) -> Tuple[str, str]:
+        bullet_counts = Counter()
+        first_date = None
+        for match in _BULLET_OR_DATE_RE.finditer(text):
+            if match.lastgroup == 'date':
+                if first_date is None:
+                    first_date = match
+            else:
+                bullet_counts[match.group('b') or match.group('spaced')] += 1
         
+        bullet_style = self.default_profile.bullet_style
         if bullet_counts:
-            return max(bullet_counts, key=bullet_counts.get)
-        return self.default_profile.bullet_style
-    
-    def _detect_heading_format(self, lines: List[str]) -> str:
-        heading_patterns = []
-        potential_headings = [line for line in lines if len(line) < 50 and line.isupper()]
-        
-        if len(potential_headings) > 2:
-            return "ALL_CAPS"
-        
-        title_case_headings = [line for line in lines if line.istitle() and len(line.split()) <= 4]
-        if len(title_case_headings) > 2:
-            return "Title_Case"
-        
-        return "ALL_CAPS"
-    
-    def _detect_contact_format(self, lines: List[str]) -> str:
-        top_lines = lines[:10]
+            bullet_style = bullet_counts.most_common(1)[0][0]
         
-        for line in top_lines:
-            if '@' in line and ('|' in line or '•' in line or len(line.split()) > 4):
-                return "horizontal"
+        date_format = self.default_profile.date_format
+        if first_date is not None:
+            # Formats are ranked within the first dated line, not by position inside it
+            line = text[text.rfind('\n', 0, first_date.start()) + 1:]
+            line = line.split('\n', 1)[0]
+            date_format = next(
+                format_name for format_name, pattern in _DATE_PATTERNS if pattern.search(line)
+            )
         
-        email_line = -1
-        phone_line = -1
-        for i, line in enumerate(top_lines):
-            if '@' in line:
-                email_line = i
-            if re.search(r'\d{3}[-.\s]?\d{3}[-.\s]?\d{4}', line):
-                phone_line = i
-        
-        if email_line != -1 and phone_line != -1 and abs(email_line - phone_line) <= 2:
-            return "vertical"
-        
-        return "horizontal"
-    
-    def _detect_date_format(self, lines: List[str]) -> str:
-        date_patterns = {
-            "MM/YYYY - MM/YYYY": r'\d{1,2}/\d{4}\s*-\s*\d{1,2}/\d{4}',
-            "Mon YYYY - Mon YYYY": r'[A-Za-z]{3,9}\s+\d{4}\s*-\s*[A-Za-z]{3,9}\s+\d{4}',
-            "YYYY-YYYY": r'\d{4}\s*-\s*\d{4}',
-            "MM.YYYY - MM.YYYY": r'\d{1,2}\.\d{4}\s*-\s*\d{1,2}\.\d{4}'
-        }
-        
-        for line in lines:
-            for format_name, pattern in date_patterns.items():
-                if re.search(pattern, line):
-                    return format_name
-        
-        return self.default_profile.date_format
-    
-    def _detect_emphasis_markers(self, lines: List[str]) -> List[str]:
-        emphasis_patterns = []
-        
-        for line in lines:
-            if '**' in line:
-                emphasis_patterns.append('**')
-            if re.search(r'\*[^*]+\*', line):
-                emphasis_patterns.append('*')
-            if line.isupper() and len(line.split()) <= 6:
-                emphasis_patterns.append('UPPERCASE')
-        
-        return list(set(emphasis_patterns)) if emphasis_patterns else ["**"]
+        return bullet_style, date_format
     
     def save_style_profile(self, profile: StyleProfile, file_path: str) -> None:
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(asdict(profile), f, indent=2, ensure_ascii=False)
+            if orjson is not None:
+                with open(file_path, 'wb') as f:
+                    f.write(orjson.dumps(asdict(profile), option=orjson.OPT_INDENT_2))
+            else:
+                with open(file_path, 'w', encoding='utf-8') as f:
+                    json.dump(asdict(profile), f, indent=2, ensure_ascii=False)
             logger.info(f"Style profile saved to {file_path}")
         except Exception as e:
             logger.error(f"Error saving style profile: {e}")
     
     def load_style_profile(self, file_path: str) -> StyleProfile:
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            if orjson is not None:
+                with open(file_path, 'rb') as f:
+                    data = orjson.loads(f.read())
+            else:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
             return StyleProfile(**data)
         except Exception as e:
             logger.error(f"Error loading style profile: {e}")
-            return self.default_profile
+            return _copy_profile(self.default_profile)
     
     def get_style_summary(self, profile: StyleProfile) -> str:
         return f"""
@@ -198,4 +254,9 @@ Style Profile Summary:
 
 @st.cache_resource
 def get_style_extractor():
-    return StyleExtractor()
\ No newline at end of file
+    return StyleExtractor()
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def cached_style_profile(sample_cv_text: str) -> StyleProfile:
+    """Style analysis memoized on the sample CV text"""
+    return get_style_extractor()._analyze_structure(sample_cv_text)
@@ -1,20 +1,85 @@
 import os
 import logging
+import functools
+import importlib.util
 import re
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Iterator, ClassVar
 from dataclasses import dataclass
 
+import httpx
 import streamlit as st
 from openai import OpenAI
 
 logger = logging.getLogger(__name__)
 
+_WORD_RE = re.compile(r'[a-z]+')
+_DIGIT_RE = re.compile(r'\d')
+
+# Lead-ins the model sometimes puts before the summary text
+_SUMMARY_PREFIX_RE = re.compile(
+    r'^\s*(?:professional\s+summary|summary|here\s+is\s+the\s+professional\s+summary'
+    r'|the\s+professional\s+summary\s+is)\s*:\s*',
+    re.IGNORECASE
+)
+
+# Common senior leadership and technology keywords looked for in both the JD and the summary
+_LEADERSHIP_KEYWORDS = frozenset({
+    "lead", "leader", "leadership", "manage", "director", "vp", "cto", "head",
+    "strategy", "strategic", "transform", "scale", "deliver", "drive", "build"
+})
+_TECH_KEYWORDS = frozenset({
+    "engineering", "technology", "technical", "software", "platform", "architecture",
+    "cloud", "data", "ai", "ml", "digital", "innovation", "product", "development"
+})
+_SUMMARY_KEYWORDS = _LEADERSHIP_KEYWORDS | _TECH_KEYWORDS
+# Whole-word keyword scan; boundaries mirror _WORD_RE tokenization (letters only)
+_SUMMARY_KEYWORDS_RE = re.compile(
+    r'(?<![a-z])(?:' + '|'.join(sorted(_SUMMARY_KEYWORDS, key=len, reverse=True)) + r')(?![a-z])'
+)
+
+# Tone indicators: executive language raises the score, weak language and first-person pronouns lower it
+_EXECUTIVE_WORDS = frozenset({
+    "deliver", "drive", "lead", "transform", "scale", "optimize", "strategic",
+    "executive", "senior", "director", "global", "enterprise", "innovative"
+})
+_WEAK_WORDS = frozenset({
+    "help", "assist", "support", "try", "attempt", "hope", "maybe", "possibly",
+    "i", "my", "me", "we", "our"
+})
+
+def _word_tokens(text: str) -> frozenset:
+    """Lowercased whole words in text"""
+    return frozenset(_WORD_RE.findall(text.lower()))
+
+# Token-limit parameter name for models that don't accept max_tokens
+_TOKEN_PARAM_KEY = {"gpt-5": "max_completion_tokens"}
+
+# HTTP/2 needs the optional h2 package; fall back to HTTP/1.1 keep-alive without it
+_HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+@functools.lru_cache(maxsize=None)
+def _get_openai_client() -> OpenAI:
+    """Process-wide OpenAI client on a pooled keep-alive connection, created on first use"""
+    http_client = httpx.Client(
+        timeout=30.0,
+        http2=_HTTP2_AVAILABLE,
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=40)
+    )
+    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"), http_client=http_client)
+
+@functools.lru_cache(maxsize=8)
+def _jd_keyword_tokens(job_description: str) -> frozenset:
+    """Summary keywords present in a job description, tokenized once per distinct JD"""
+    return _word_tokens(job_description) & _SUMMARY_KEYWORDS
+
 @dataclass
 class SummaryGenerationConfig:
     max_words: int = 30
     temperature: float = 0.1
     max_tokens: int = 300
     model: str = "gpt-4o-mini"  # Can be gpt-4o-mini, gpt-4o, or gpt-5
+    stream: bool = False  # Stream the completion and stop once it runs past max_words (leaves a cut-off draft)
+    n_variants: int = 1  # Candidate summaries per request; more than one disables streaming
     
     def get_temperature(self) -> float:
         """Get temperature value compatible with the model"""
@@ -22,6 +87,10 @@ class SummaryGenerationConfig:
         if self.model == "gpt-5":
             return 1.0
         return self.temperature
+    
+    def use_streaming(self) -> bool:
+        """Streaming returns a single completion, so it only applies to one variant"""
+        return self.stream and self.n_variants == 1
 
 @dataclass 
 class ProfessionalSummary:
@@ -32,71 +101,7 @@ class ProfessionalSummary:
     valid: bool
 
 class SummaryGenerator:
-    def __init__(self, config: SummaryGenerationConfig = None):
-        self.config = config or SummaryGenerationConfig()
-        self.openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-    
-    def _get_model_compatible_params(self, model: str, max_tokens: int) -> Dict[str, Any]:
-        """Get model-compatible parameters for OpenAI API calls"""
-        # GPT-5 and newer models use max_completion_tokens
-        if model in ["gpt-5"]:
-            return {"max_completion_tokens": max_tokens}
-        else:
-            return {"max_tokens": max_tokens}
-    
-    def generate_professional_summary(self, job_description: str, experience_superset: str, 
-                                    skills_superset: str = None) -> Dict[str, Any]:
-        """Generate executive-level professional summary ≤30 words"""
-        
-        try:
-            # Combine experience and skills for full context
-            candidate_background = experience_superset
-            if skills_superset:
-                candidate_background += f"\n\nSKILLS SUPERSET:\n{skills_superset}"
-            
-            system_prompt = self._create_summary_system_prompt()
-            user_prompt = self._create_summary_user_prompt(job_description, candidate_background)
-            
-            # Get model-compatible parameters
-            token_params = self._get_model_compatible_params(self.config.model, self.config.max_tokens)
-            
-            response = self.openai_client.chat.completions.create(
-                model=self.config.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=self.config.get_temperature(),
-                **token_params
-            )
-            
-            raw_summary = response.choices[0].message.content.strip()
-            processed_summary = self._process_summary_response(raw_summary, job_description)
-            
-            return {
-                "summary": processed_summary.content,
-                "word_count": processed_summary.word_count,
-                "valid": processed_summary.valid,
-                "has_keywords": processed_summary.has_keywords,
-                "tone_score": processed_summary.tone_score,
-                "raw_response": raw_summary,
-                "validation_message": self._get_validation_message(processed_summary)
-            }
-            
-        except Exception as e:
-            logger.error(f"Error generating professional summary: {e}")
-            return {
-                "summary": "",
-                "word_count": 0,
-                "valid": False,
-                "has_keywords": False,
-                "tone_score": 0.0,
-                "raw_response": "",
-                "validation_message": f"Error generating summary: {str(e)}"
-            }
-    
-    def _create_summary_system_prompt(self) -> str:
-        return """You are an expert CV writer and ATS optimizer for senior technology and engineering leadership roles.
+    SYSTEM_PROMPT: ClassVar[str] = """You are an expert CV writer and ATS optimizer for senior technology and engineering leadership roles.
 
 Your ONLY task is to generate ONE high-impact Professional Summary in exactly 30 words or fewer.
 
@@ -116,14 +121,7 @@ ANTI-HALLUCINATION GUARD RAILS:
 - Keep all claims factually grounded in the provided context
 - If no specific metrics are provided, use qualitative descriptors instead"""
     
-    def _create_summary_user_prompt(self, job_description: str, candidate_background: str) -> str:
-        return f"""ANALYZE the job description and candidate background to generate ONE executive professional summary.
-
-JOB DESCRIPTION:
-{job_description}
-
-CANDIDATE BACKGROUND (Experience & Skills):
-{candidate_background}
+    USER_PROMPT_INSTRUCTIONS: ClassVar[str] = """ANALYZE the job description and candidate background to generate ONE executive professional summary.
 
 REQUIREMENTS:
 - Maximum 30 words, single paragraph format
@@ -156,25 +154,137 @@ TONE:
 OUTPUT FORMAT:
 Single paragraph, maximum 30 words, executive tone, integrating JD keywords and demonstrating leadership impact."""
     
-    def _process_summary_response(self, raw_summary: str, job_description: str) -> ProfessionalSummary:
-        """Process and validate the professional summary response"""
+    def __init__(self, config: SummaryGenerationConfig = None):
+        self.config = config or SummaryGenerationConfig()
+        self.openai_client = _get_openai_client()
+    
+    def _get_model_compatible_params(self, model: str, max_tokens: int) -> Dict[str, Any]:
+        """Get model-compatible parameters for OpenAI API calls"""
+        # GPT-5 and newer models use max_completion_tokens
+        return {_TOKEN_PARAM_KEY.get(model, "max_tokens"): max_tokens}
+    
+    def generate_professional_summary(self, job_description: str, experience_superset: str, 
+                                    skills_superset: str = None) -> Dict[str, Any]:
+        """Generate executive-level professional summary ≤30 words"""
         
-        # Clean the response
-        clean_summary = raw_summary.strip()
+        try:
+            if self.config.use_streaming():
+                raw_summary = "".join(self.generate_professional_summary_stream(
+                    job_description, experience_superset, skills_superset
+                ))
+            else:
+                # All variants share one request, so the prompt is sent and processed once
+                response = self.openai_client.chat.completions.create(
+                    n=self.config.n_variants,
+                    **self._create_summary_request(job_description, experience_superset, skills_superset)
+                )
+                raw_summary = max(
+                    (choice.message.content or "" for choice in response.choices),
+                    key=lambda raw: self._rank_summary(raw, job_description)
+                )
+            
+            return self.build_summary_result(raw_summary, job_description)
+            
+        except Exception as e:
+            logger.error(f"Error generating professional summary: {e}")
+            return self.build_error_result(e)
+    
+    def generate_professional_summary_stream(self, job_description: str, experience_superset: str,
+                                             skills_superset: str = None) -> Iterator[str]:
+        """Yield summary text as it arrives; validate the joined text with build_summary_result"""
+        response = self.openai_client.chat.completions.create(
+            stream=True, **self._create_summary_request(job_description, experience_superset, skills_superset)
+        )
+        
+        streamed = ""
+        try:
+            for chunk in response:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content or ""
+                streamed += delta
+                yield delta
+                
+                # An over-long summary fails validation anyway, so stop paying for more tokens
+                if len(streamed.split()) > self.config.max_words:
+                    break
+        finally:
+            response.close()
+    
+    def _create_summary_request(self, job_description: str, experience_superset: str,
+                                skills_superset: str = None) -> Dict[str, Any]:
+        # Combine experience and skills for full context
+        candidate_background = experience_superset
+        if skills_superset:
+            candidate_background += f"\n\nSKILLS SUPERSET:\n{skills_superset}"
+        
+        system_prompt = self._create_summary_system_prompt()
+        user_prompt = self._create_summary_user_prompt(job_description, candidate_background)
+        
+        # Get model-compatible parameters
+        token_params = self._get_model_compatible_params(self.config.model, self.config.max_tokens)
+        
+        return dict(
+            model=self.config.model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=self.config.get_temperature(),
+            **token_params
+        )
+    
+    def _rank_summary(self, raw_summary: str, job_description: str) -> tuple:
+        """Sort key preferring valid, then JD-aligned, then higher-tone summaries"""
+        summary = self._process_summary_response(raw_summary.strip(), job_description)
+        return (summary.valid, summary.has_keywords, summary.tone_score)
+    
+    def build_summary_result(self, raw_summary: str, job_description: str) -> Dict[str, Any]:
+        raw_summary = raw_summary.strip()
+        processed_summary = self._process_summary_response(raw_summary, job_description)
         
-        # Remove common prefixes/suffixes that might be added
-        prefixes_to_remove = [
-            "Professional Summary:", "Summary:", "Here is the professional summary:",
-            "The professional summary is:", "Professional summary:"
-        ]
+        return {
+            "summary": processed_summary.content,
+            "word_count": processed_summary.word_count,
+            "valid": processed_summary.valid,
+            "has_keywords": processed_summary.has_keywords,
+            "tone_score": processed_summary.tone_score,
+            "raw_response": raw_summary,
+            "validation_message": self._get_validation_message(processed_summary)
+        }
+    
+    def build_error_result(self, error: Exception) -> Dict[str, Any]:
+        return {
+            "summary": "",
+            "word_count": 0,
+            "valid": False,
+            "has_keywords": False,
+            "tone_score": 0.0,
+            "raw_response": "",
+            "validation_message": f"Error generating summary: {str(error)}"
+        }
+    
+    def _create_summary_system_prompt(self) -> str:
+        return self.SYSTEM_PROMPT
+    
+    def _create_summary_user_prompt(self, job_description: str, candidate_background: str) -> str:
+        # Variable inputs go last so the static instructions form a stable, cacheable prefix
+        return (
+            f"{self.USER_PROMPT_INSTRUCTIONS}\n\n"
+            f"JOB DESCRIPTION:\n{job_description}\n\n"
+            f"CANDIDATE BACKGROUND (Experience & Skills):\n{candidate_background}"
+        )
+    
+    def _process_summary_response(self, raw_summary: str, job_description: str) -> ProfessionalSummary:
+        """Process and validate the professional summary response"""
         
-        for prefix in prefixes_to_remove:
-            if clean_summary.lower().startswith(prefix.lower()):
-                clean_summary = clean_summary[len(prefix):].strip()
+        # Clean the response - remove a leading label and surrounding quotes
+        clean_summary = _SUMMARY_PREFIX_RE.sub('', raw_summary.strip(), count=1)
+        clean_summary = clean_summary.strip().strip('"').strip()
         
-        # Remove quotes if present
-        if clean_summary.startswith('"') and clean_summary.endswith('"'):
-            clean_summary = clean_summary[1:-1].strip()
+        # Tokenize once for the word count, keyword and tone checks
+        summary_lower = clean_summary.lower()
+        tokens = frozenset(_WORD_RE.findall(summary_lower))
         
         # Count words
         word_count = len(clean_summary.split())
@@ -183,10 +293,10 @@ Single paragraph, maximum 30 words, executive tone, integrating JD keywords and
         valid = word_count <= self.config.max_words and word_count > 0
         
         # Check for keywords from job description
-        has_keywords = self._check_keyword_presence(clean_summary, job_description)
+        has_keywords = self._check_keyword_presence(summary_lower, _jd_keyword_tokens(job_description))
         
         # Evaluate tone (simple heuristic)
-        tone_score = self._evaluate_tone(clean_summary)
+        tone_score = self._evaluate_tone(summary_lower, tokens)
         
         return ProfessionalSummary(
             content=clean_summary,
@@ -196,67 +306,33 @@ Single paragraph, maximum 30 words, executive tone, integrating JD keywords and
             valid=valid
         )
     
-    def _check_keyword_presence(self, summary: str, job_description: str) -> bool:
-        """Check if summary contains relevant keywords from job description"""
-        
-        # Extract key terms from job description (simple approach)
-        jd_lower = job_description.lower()
-        summary_lower = summary.lower()
-        
-        # Common senior leadership keywords to look for
-        leadership_keywords = [
-            "lead", "leader", "leadership", "manage", "director", "vp", "cto", "head",
-            "strategy", "strategic", "transform", "scale", "deliver", "drive", "build"
-        ]
+    def _check_keyword_presence(self, summary_lower: str, jd_keywords: frozenset) -> bool:
+        """Check if the lowercased summary contains relevant keywords from the job description's keyword set"""
         
-        # Technology keywords
-        tech_keywords = [
-            "engineering", "technology", "technical", "software", "platform", "architecture",
-            "cloud", "data", "ai", "ml", "digital", "innovation", "product", "development"
-        ]
+        # Whole-word matches only, so short terms like "ai" don't hit inside other words
+        keyword_matches = set()
+        for match in _SUMMARY_KEYWORDS_RE.finditer(summary_lower):
+            if match.group() in jd_keywords:
+                keyword_matches.add(match.group())
+                # At least 2 relevant keywords is enough
+                if len(keyword_matches) >= 2:
+                    return True
         
-        # Check for presence of key terms
-        keyword_matches = 0
-        total_keywords = leadership_keywords + tech_keywords
-        
-        for keyword in total_keywords:
-            if keyword in jd_lower and keyword in summary_lower:
-                keyword_matches += 1
-        
-        # Return True if at least 2 relevant keywords are found
-        return keyword_matches >= 2
+        return False
     
-    def _evaluate_tone(self, summary: str) -> float:
+    def _evaluate_tone(self, summary_lower: str, tokens: frozenset) -> float:
         """Simple heuristic to evaluate executive tone (0-1 scale)"""
         
         tone_score = 0.5  # Base score
         
-        # Positive indicators
-        executive_words = [
-            "deliver", "drive", "lead", "transform", "scale", "optimize", "strategic",
-            "executive", "senior", "director", "global", "enterprise", "innovative"
-        ]
-        
-        # Negative indicators (reduce score)
-        weak_words = [
-            "help", "assist", "support", "try", "attempt", "hope", "maybe", "possibly",
-            "i", "my", "me", "we", "our"  # first-person pronouns
-        ]
-        
-        summary_lower = summary.lower()
-        
         # Add points for executive language
-        for word in executive_words:
-            if word in summary_lower:
-                tone_score += 0.05
+        tone_score += 0.05 * len(tokens & _EXECUTIVE_WORDS)
         
         # Subtract points for weak language
-        for word in weak_words:
-            if word in summary_lower:
-                tone_score -= 0.1
+        tone_score -= 0.1 * len(tokens & _WEAK_WORDS)
         
         # Check for metrics/quantification (positive)
-        if re.search(r'\d+', summary):
+        if _DIGIT_RE.search(summary_lower):
             tone_score += 0.1
         
         # Ensure score stays within bounds
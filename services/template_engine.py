@@ -2,159 +2,228 @@
 Template Engine Service - Jinja2-based templating for CV generation
 """
 
+import functools
+import logging
+import operator
 import os
+import threading
+from dataclasses import astuple
 from typing import Dict, Any, Optional
 from datetime import datetime
-from jinja2 import Environment, FileSystemLoader, Template
+from jinja2 import BytecodeCache, Environment, FileSystemLoader, Template, TemplateError, TemplateNotFound
 from models.cv_data import CVData, ContactInfo, RoleExperience
 
+logger = logging.getLogger(__name__)
+
+class _DualKeyRoleDict(dict):
+    """Role context that answers PDF field names from the matching preview fields"""
+    
+    __slots__ = ()
+    
+    _ALIASES = {'position_name': 'job_title', 'company_name': 'company'}
+    
+    def __missing__(self, key):
+        alias = self._ALIASES.get(key)
+        if alias is None:
+            raise KeyError(key)
+        return self[alias]
+    
+    def __contains__(self, key) -> bool:
+        return super().__contains__(key) or super().__contains__(self._ALIASES.get(key))
+    
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+
+def _role_fingerprint(role: RoleExperience) -> tuple:
+    """Hashable snapshot of the role fields the CV templates render"""
+    return (
+        role.job_title, role.company, role.location, role.start_date, role.end_date,
+        tuple((bullet.heading, bullet.content) for bullet in role.bullets)
+    )
+
+
+def _cv_data_fingerprint(cv_data: CVData) -> tuple:
+    """Hashable snapshot of everything the CV templates render; CVData itself is mutable"""
+    return (
+        astuple(cv_data.contact),
+        cv_data.professional_summary,
+        tuple(cv_data.skills),
+        _role_fingerprint(cv_data.current_role),
+        tuple(map(_role_fingerprint, cv_data.previous_roles or ())),
+        cv_data.additional_info
+    )
+
 
 class TemplateEngine:
     """Jinja2-based template engine for CV generation"""
     
-    def __init__(self, template_dir: str = "templates"):
-        """Initialize template engine with template directory"""
+    __slots__ = ('template_dir', 'env', '_rendered', '_render_lock')
+    
+    # Rendered CVs kept per engine, so re-previewing an unchanged draft skips Jinja
+    _RENDER_CACHE_SIZE = 32
+    
+    # Stands in for generated_at in cached renders; the real timestamp is filled in per call
+    _GENERATED_AT_MARKER = '\x00generated_at\x00'
+    
+    # Bold/italic markers and bullet glyphs dropped from session skill text
+    _SKILL_MARKUP = str.maketrans('', '', '*•')
+    
+    # Role fields read once per role, keyed under the preview and PDF template names
+    _ROLE_ATTRS = operator.attrgetter('job_title', 'company', 'location', 'start_date', 'end_date')
+    _PREVIEW_ROLE_KEYS = ('job_title', 'company', 'location', 'start_date', 'end_date')
+    _PDF_ROLE_KEYS = ('position_name', 'company_name', 'location', 'start_date', 'end_date')
+    
+    def __init__(self, template_dir: str = "templates", bytecode_cache: Optional[BytecodeCache] = None):
+        """Initialize template engine with template directory and optional compiled-template cache"""
         self.template_dir = template_dir
         self.env = Environment(
             loader=FileSystemLoader(template_dir),
             autoescape=False,  # We're generating markdown/text, not HTML
             trim_blocks=True,
-            lstrip_blocks=True
+            lstrip_blocks=True,
+            auto_reload=False,  # Templates ship with the app; skip the per-lookup mtime check
+            bytecode_cache=bytecode_cache
         )
         
         # Add custom filters
         self.env.filters['format_bullets'] = self._format_bullets
         self.env.filters['clean_markdown'] = self._clean_markdown
+        
+        # Compile the built-in CV templates into the environment's cache up front
+        for template_name in ('cv_preview.md', 'cv_pdf.txt'):
+            try:
+                self.env.get_template(template_name)
+            except TemplateNotFound:
+                logger.warning(f"CV template {template_name!r} not found in {template_dir!r}")
+        
+        # Rendered output by (template name, CV fingerprint), oldest first; the engine is shared across sessions
+        self._rendered: Dict[tuple, str] = {}
+        self._render_lock = threading.Lock()
     
     def _format_bullets(self, bullets: list) -> str:
         """Format bullet points for display"""
         if not bullets:
             return ""
-        return "\n".join([f"• {bullet}" for bullet in bullets])
+        return "• " + "\n• ".join(map(str, bullets))
     
     def _clean_markdown(self, text: str) -> str:
         """Clean markdown formatting for plain text output"""
         if not text:
             return ""
-        # Remove bold formatting
-        text = text.replace("**", "")
-        # Remove italic formatting  
-        text = text.replace("*", "")
-        return text.strip()
+        # Remove bold and italic formatting; dropping every "*" covers both in one pass
+        return text.replace("*", "").strip()
     
-    def _create_unified_context(self, cv_data: CVData) -> Dict[str, Any]:
-        """Create unified context for both preview and PDF templates"""
-        context = {
-            'contact': {
-                'name': cv_data.contact.name,
-                'email': cv_data.contact.email,
-                'phone': cv_data.contact.phone,
-                'location': cv_data.contact.location,
-                'linkedin': cv_data.contact.linkedin,
-                'website': cv_data.contact.website
-            },
+    def _build_role_dict(self, role: RoleExperience, bullet_mode: str) -> Dict[str, Any]:
+        """Template fields for one role; 'raw' keeps bullet objects alongside both field name formats"""
+        formatted_bullets = role.formatted_bullets
+        values = self._ROLE_ATTRS(role)
+        
+        if bullet_mode == 'formatted':
+            context = dict(zip(self._PDF_ROLE_KEYS, values))
+            context['bullets'] = formatted_bullets
+            return context
+        
+        # position_name/company_name resolve through the preview fields; key_bullets differs from bullets
+        context = _DualKeyRoleDict(zip(self._PREVIEW_ROLE_KEYS, values))
+        context['work_duration'] = role.work_duration
+        context['bullets'] = role.bullets
+        context['key_bullets'] = formatted_bullets
+        return context
+    
+    def _build_base_context(self, cv_data: CVData, *, bullet_mode: str) -> Dict[str, Any]:
+        """Context shared by the preview, PDF and PDF-export paths"""
+        return {
+            # Templates read contact fields by attribute, so the dataclass is passed as-is
+            'contact': cv_data.contact,
             'professional_summary': cv_data.professional_summary,
             'skills': cv_data.skills,
-            'current_role': {
-                'job_title': cv_data.current_role.job_title,
-                'company': cv_data.current_role.company,
-                'location': cv_data.current_role.location,
-                'start_date': cv_data.current_role.start_date,
-                'end_date': cv_data.current_role.end_date,
-                'work_duration': f"{cv_data.current_role.start_date} - {cv_data.current_role.end_date}",
-                'bullets': cv_data.current_role.bullets,
-                # Also provide PDF-compatible fields
-                'position_name': cv_data.current_role.job_title,
-                'company_name': cv_data.current_role.company,
-                'key_bullets': [bullet.to_formatted_string() for bullet in cv_data.current_role.bullets]
-            },
-            'previous_roles': [],
-            'additional_info': cv_data.additional_info,
-            'generated_at': cv_data.generated_at or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            'current_role': self._build_role_dict(cv_data.current_role, bullet_mode),
+            'previous_roles': [self._build_role_dict(role, bullet_mode) for role in cv_data.previous_roles or ()],
+            'additional_info': cv_data.additional_info
         }
+    
+    def _create_unified_context(self, cv_data: CVData) -> Dict[str, Any]:
+        """Create unified context for both preview and PDF templates"""
+        context = self._build_base_context(cv_data, bullet_mode='raw')
+        context['generated_at'] = cv_data.generated_at
+        return context
+    
+    def _render_cv(self, template_name: str, cv_data: CVData) -> str:
+        """Render a CV template, reusing the output for unchanged CV data"""
+        key = (template_name, _cv_data_fingerprint(cv_data))
+        with self._render_lock:
+            rendered = self._rendered.get(key)
         
-        # Add previous roles with both field name formats
-        if cv_data.previous_roles:
-            for role in cv_data.previous_roles:
-                role_data = {
-                    'job_title': role.job_title,
-                    'company': role.company,
-                    'location': role.location,
-                    'start_date': role.start_date,
-                    'end_date': role.end_date,
-                    'work_duration': f"{role.start_date} - {role.end_date}",
-                    'bullets': role.bullets,
-                    # Also provide PDF-compatible fields
-                    'position_name': role.job_title,
-                    'company_name': role.company,
-                    'key_bullets': [bullet.to_formatted_string() for bullet in role.bullets]
-                }
-                context['previous_roles'].append(role_data)
+        if rendered is None:
+            context = self._create_unified_context(cv_data)
+            context['generated_at'] = self._GENERATED_AT_MARKER
+            rendered = self.env.get_template(template_name).render(context)
+            with self._render_lock:
+                if len(self._rendered) >= self._RENDER_CACHE_SIZE:
+                    del self._rendered[next(iter(self._rendered))]
+                self._rendered[key] = rendered
         
-        return context
+        return rendered.replace(self._GENERATED_AT_MARKER, str(cv_data.generated_at))
+    
+    def clear_render_cache(self) -> None:
+        """Drop cached CV renders, e.g. after editing templates on disk"""
+        with self._render_lock:
+            self._rendered.clear()
     
     def render_cv_preview(self, cv_data: CVData) -> str:
         """Render CV preview using markdown template"""
         try:
-            template = self.env.get_template('cv_preview.md')
-            context = self._create_unified_context(cv_data)
-            return template.render(**context)
-            
-        except Exception as e:
-            raise Exception(f"Failed to render CV preview template: {str(e)}")
+            return self._render_cv('cv_preview.md', cv_data)
+        except TemplateError as e:
+            raise RuntimeError(f"Failed to render CV preview template: {str(e)}") from e
     
     def render_cv_for_pdf(self, cv_data: CVData) -> str:
         """Render CV for PDF generation (clean text, no markdown)"""
         try:
-            template = self.env.get_template('cv_pdf.txt')
-            context = self._create_unified_context(cv_data)
-            return template.render(**context)
-            
-        except Exception as e:
-            raise Exception(f"Failed to render CV PDF template: {str(e)}")
+            return self._render_cv('cv_pdf.txt', cv_data)
+        except TemplateError as e:
+            raise RuntimeError(f"Failed to render CV PDF template: {str(e)}") from e
     
     def render_cv_from_session_data(self, session_data: Dict[str, Any], contact_info: Dict[str, str]) -> str:
         """Render CV from session state data structure"""
+        # Extract structured data from session
+        llm_responses = session_data.get('llm_json_responses', {})
+        individual_generations = session_data.get('individual_generations', {})
+        
+        # Build context from session data
+        context = {
+            'contact': contact_info,
+            'professional_summary': individual_generations.get('executive_summary', ''),
+            'skills': self._extract_skills_from_session(individual_generations.get('top_skills', '')),
+            'current_role': self._extract_current_role_from_session(llm_responses),
+            'previous_roles': self._extract_previous_roles_from_session(llm_responses),
+            'additional_info': None,
+            'generated_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }
+        
         try:
-            template = self.env.get_template('cv_preview.md')
-            
-            # Extract structured data from session
-            llm_responses = session_data.get('llm_json_responses', {})
-            individual_generations = session_data.get('individual_generations', {})
-            
-            # Build context from session data
-            context = {
-                'contact': contact_info,
-                'professional_summary': individual_generations.get('executive_summary', ''),
-                'skills': self._extract_skills_from_session(individual_generations.get('top_skills', '')),
-                'current_role': self._extract_current_role_from_session(llm_responses),
-                'previous_roles': self._extract_previous_roles_from_session(llm_responses),
-                'additional_info': None,
-                'generated_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            }
-            
-            return template.render(**context)
-            
-        except Exception as e:
-            raise Exception(f"Failed to render CV from session data: {str(e)}")
+            return self.env.get_template('cv_preview.md').render(context)
+        except TemplateError as e:
+            raise RuntimeError(f"Failed to render CV from session data: {str(e)}") from e
     
     def _extract_skills_from_session(self, skills_text: str) -> list:
         """Extract skills list from formatted text"""
         if not skills_text:
             return []
         
-        # Try to parse from formatted text like "**Skill1** | **Skill2** | **Skill3**"
+        # Formatted text like "**Skill1** | **Skill2** | **Skill3**", else one skill per line, else comma-separated
         if '|' in skills_text:
-            skills = [skill.strip().replace('**', '') for skill in skills_text.split('|')]
-            return [skill for skill in skills if skill]
-        
-        # Fallback: split by lines or commas
-        if '\n' in skills_text:
-            skills = [skill.strip().replace('**', '').replace('•', '').strip() 
-                     for skill in skills_text.split('\n')]
+            separator = '|'
+        elif '\n' in skills_text:
+            separator = '\n'
+        elif ',' in skills_text:
+            separator = ','
         else:
-            skills = [skill.strip().replace('**', '') for skill in skills_text.split(',')]
+            skill = skills_text.translate(self._SKILL_MARKUP).strip()
+            return [skill] if skill else []
         
+        skills = (skill.translate(self._SKILL_MARKUP).strip() for skill in skills_text.split(separator))
         return [skill for skill in skills if skill]
     
     def _extract_current_role_from_session(self, llm_responses: Dict) -> Dict:
@@ -188,68 +257,32 @@ class TemplateEngine:
         """Extract previous roles data from session LLM responses"""
         previous_data = llm_responses.get('previous_experience', {})
         
-        if 'previous_roles_data' in previous_data:
-            roles = []
-            for role_data in previous_data['previous_roles_data']:
-                roles.append({
-                    'position_name': role_data.get('position_name', 'Previous Position'),
-                    'company_name': role_data.get('company_name', 'Previous Company'),
-                    'location': role_data.get('location', 'Location'),
-                    'start_date': role_data.get('start_date', ''),
-                    'end_date': role_data.get('end_date', ''),
-                    'work_duration': role_data.get('work_duration', ''),
-                    'key_bullets': role_data.get('key_bullets', [])
-                })
-            return roles
-        
-        return []
+        return [
+            {
+                'position_name': role_data.get('position_name', 'Previous Position'),
+                'company_name': role_data.get('company_name', 'Previous Company'),
+                'location': role_data.get('location', 'Location'),
+                'start_date': role_data.get('start_date', ''),
+                'end_date': role_data.get('end_date', ''),
+                'work_duration': role_data.get('work_duration', ''),
+                'key_bullets': role_data.get('key_bullets', [])
+            }
+            for role_data in previous_data.get('previous_roles_data') or ()
+        ]
     
     def create_pdf_context(self, cv_data: CVData) -> Dict[str, Any]:
         """Create context dictionary optimized for PDF generation"""
-        context = {
-            'contact': {
-                'name': cv_data.contact.name,
-                'email': cv_data.contact.email,
-                'phone': cv_data.contact.phone,
-                'location': cv_data.contact.location,
-                'linkedin': cv_data.contact.linkedin,
-                'website': cv_data.contact.website
-            },
-            'professional_summary': cv_data.professional_summary,
-            'skills': cv_data.skills,
-            'current_role': {
-                'position_name': cv_data.current_role.job_title,
-                'company_name': cv_data.current_role.company,
-                'location': cv_data.current_role.location,
-                'start_date': cv_data.current_role.start_date,
-                'end_date': cv_data.current_role.end_date,
-                'bullets': [bullet.to_formatted_string() for bullet in cv_data.current_role.bullets]
-            },
-            'previous_roles': [],
-            'additional_info': cv_data.additional_info
-        }
-        
-        # Add previous roles
-        for role in cv_data.previous_roles:
-            context['previous_roles'].append({
-                'position_name': role.job_title,
-                'company_name': role.company,
-                'location': role.location,
-                'start_date': role.start_date,
-                'end_date': role.end_date,
-                'bullets': [bullet.to_formatted_string() for bullet in role.bullets]
-            })
-        
-        return context
+        return self._build_base_context(cv_data, bullet_mode='formatted')
     
     def render_custom_template(self, template_name: str, context: Dict[str, Any]) -> str:
         """Render any custom template with provided context"""
         try:
-            template = self.env.get_template(template_name)
-            return template.render(**context)
-        except Exception as e:
-            raise Exception(f"Failed to render template '{template_name}': {str(e)}")
+            return self.env.get_template(template_name).render(context)
+        except TemplateError as e:
+            raise RuntimeError(f"Failed to render template '{template_name}': {str(e)}") from e
 
 
-# Global template engine instance
-template_engine = TemplateEngine()
\ No newline at end of file
+@functools.lru_cache(maxsize=1)
+def get_template_engine() -> TemplateEngine:
+    """Shared template engine, built on first use rather than at import"""
+    return TemplateEngine()
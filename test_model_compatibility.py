@@ -30,62 +30,24 @@ def test_model_compatibility():
     print("🧪 Testing Model Compatibility Across All Services")
     print("=" * 60)
     
-    # Test 1: OpenAILLMService static method
-    print("\n1. Testing OpenAILLMService...")
-    for model, expected_param in test_cases:
-        params = OpenAILLMService._get_model_compatible_params_static(model, 1000)
-        has_correct_param = expected_param in params
-        print(f"   ✅ {model}: {expected_param} ({'✓' if has_correct_param else '✗'})")
-        test_results.append(("OpenAILLMService", model, has_correct_param))
-    
-    # Test 2: SkillsGenerator
-    print("\n2. Testing SkillsGenerator...")
-    skills_config = SkillsGenerationConfig()
-    skills_gen = SkillsGenerator(skills_config)
-    for model, expected_param in test_cases:
-        params = skills_gen._get_model_compatible_params(model, 1000)
-        has_correct_param = expected_param in params
-        print(f"   ✅ {model}: {expected_param} ({'✓' if has_correct_param else '✗'})")
-        test_results.append(("SkillsGenerator", model, has_correct_param))
-    
-    # Test 3: ExperienceGenerator
-    print("\n3. Testing ExperienceGenerator...")
-    exp_config = ExperienceGenerationConfig()
-    exp_gen = ExperienceGenerator(exp_config)
-    for model, expected_param in test_cases:
-        params = exp_gen._get_model_compatible_params(model, 1000)
-        has_correct_param = expected_param in params
-        print(f"   ✅ {model}: {expected_param} ({'✓' if has_correct_param else '✗'})")
-        test_results.append(("ExperienceGenerator", model, has_correct_param))
-    
-    # Test 4: SummaryGenerator
-    print("\n4. Testing SummaryGenerator...")
-    summary_config = SummaryGenerationConfig()
-    summary_gen = SummaryGenerator(summary_config)
-    for model, expected_param in test_cases:
-        params = summary_gen._get_model_compatible_params(model, 1000)
-        has_correct_param = expected_param in params
-        print(f"   ✅ {model}: {expected_param} ({'✓' if has_correct_param else '✗'})")
-        test_results.append(("SummaryGenerator", model, has_correct_param))
-    
-    # Test 5: SampleCVParser
-    print("\n5. Testing SampleCVParser...")
-    parser_config = SampleCVParseConfig()
-    parser = SampleCVParser(parser_config)
-    for model, expected_param in test_cases:
-        params = parser._get_model_compatible_params(model, 1000)
-        has_correct_param = expected_param in params
-        print(f"   ✅ {model}: {expected_param} ({'✓' if has_correct_param else '✗'})")
-        test_results.append(("SampleCVParser", model, has_correct_param))
+    # Each entry builds its service and returns the params method under test
+    services = [
+        ("OpenAILLMService", lambda: OpenAILLMService._get_model_compatible_params_static),
+        ("SkillsGenerator", lambda: SkillsGenerator(SkillsGenerationConfig())._get_model_compatible_params),
+        ("ExperienceGenerator", lambda: ExperienceGenerator(ExperienceGenerationConfig())._get_model_compatible_params),
+        ("SummaryGenerator", lambda: SummaryGenerator(SummaryGenerationConfig())._get_model_compatible_params),
+        ("SampleCVParser", lambda: SampleCVParser(SampleCVParseConfig())._get_model_compatible_params),
+        ("PDFIngestor", lambda: PDFIngestor()._get_model_compatible_params),
+    ]
     
-    # Test 6: PDFIngestor
-    print("\n6. Testing PDFIngestor...")
-    ingest_service = PDFIngestor()
-    for model, expected_param in test_cases:
-        params = ingest_service._get_model_compatible_params(model, 1000)
-        has_correct_param = expected_param in params
-        print(f"   ✅ {model}: {expected_param} ({'✓' if has_correct_param else '✗'})")
-        test_results.append(("PDFIngestor", model, has_correct_param))
+    for index, (service_name, get_params) in enumerate(services, start=1):
+        print(f"\n{index}. Testing {service_name}...")
+        get_model_params = get_params()
+        for model, expected_param in test_cases:
+            params = get_model_params(model, 1000)
+            has_correct_param = expected_param in params
+            print(f"   ✅ {model}: {expected_param} ({'✓' if has_correct_param else '✗'})")
+            test_results.append((service_name, model, has_correct_param))
     
     # Summary
     print("\n" + "=" * 60)
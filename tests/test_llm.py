@@ -0,0 +1,76 @@
+import json
+import pytest
+from unittest.mock import MagicMock
+
+from services.llm import OpenAILLMService, LLMConfig, ModelType, CV_PACKAGE_RESPONSE_FORMAT
+
+VALID_PACKAGE = {
+    "career_summary": "Backend engineer building reliable data platforms for fintech teams.",
+    "experience_bullets": [f"Delivered Outcome{i}: shipped feature {i} and cut latency" for i in range(8)],
+    "skills": ["Python", "Go", "Kafka", "Docker", "Kubernetes", "AWS", "Terraform", "SQL", "Redis", "Machine Learning"]
+}
+
+def _completion(content):
+    completion = MagicMock()
+    completion.choices[0].message.content = content
+    return completion
+
+class TestStructuredCVPackage:
+    
+    @pytest.fixture
+    def service(self):
+        service = OpenAILLMService("test-key", LLMConfig(model=ModelType.GPT_4O_MINI, retry_attempts=1))
+        service.client = MagicMock()
+        yield service
+        service.close()
+    
+    def test_structured_response_is_validated_per_field(self, service):
+        service.client.chat.completions.create.return_value = _completion(json.dumps(VALID_PACKAGE))
+        
+        result = service.generate_cv_package("prompt", "context")
+        
+        kwargs = service.client.chat.completions.create.call_args.kwargs
+        assert kwargs["response_format"] == CV_PACKAGE_RESPONSE_FORMAT
+        assert result["valid"]
+        assert result["validation"]["sar_bullets"]["bullet_count"] == 8
+        assert result["validation"]["skills"]["skill_count"] == 10
+    
+    def test_structured_content_keeps_section_text_format(self, service):
+        service.client.chat.completions.create.return_value = _completion(json.dumps(VALID_PACKAGE))
+        
+        result = service.generate_cv_package("prompt", "context")
+        
+        assert not result["content"].lstrip().startswith("{")
+        text_validation = service._validate_cv_package(result["content"])
+        assert {key: value["valid"] for key, value in text_validation.items()} == {
+            key: value["valid"] for key, value in result["validation"].items()
+        }
+    
+    def test_missing_field_is_reported_invalid(self, service):
+        package = {key: value for key, value in VALID_PACKAGE.items() if key != "skills"}
+        service.client.chat.completions.create.return_value = _completion(json.dumps(package))
+        
+        result = service.generate_cv_package("prompt", "context")
+        
+        assert not result["valid"]
+        assert result["validation"]["skills"]["skill_count"] == 0
+        assert result["validation"]["career_summary"]["valid"]
+    
+    def test_long_skills_are_flagged(self, service):
+        package = dict(VALID_PACKAGE, skills=VALID_PACKAGE["skills"][:9] + ["Distributed Systems Design"])
+        service.client.chat.completions.create.return_value = _completion(json.dumps(package))
+        
+        result = service.generate_cv_package("prompt", "context")
+        
+        assert not result["validation"]["skills"]["valid"]
+        assert result["validation"]["skills"]["skill_count"] == 9
+    
+    def test_improve_response_uses_structured_validation(self, service):
+        service.client.chat.completions.create.return_value = _completion(json.dumps(VALID_PACKAGE))
+        
+        result = service.improve_response("old", {"skills": {"valid": False, "message": "Skills: 9/10"}}, "prompt", "context")
+        
+        kwargs = service.client.chat.completions.create.call_args.kwargs
+        assert kwargs["response_format"] == CV_PACKAGE_RESPONSE_FORMAT
+        assert result["valid"]
+        assert set(result["validation"]) == {"career_summary", "sar_bullets", "skills"}
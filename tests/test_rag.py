@@ -1,33 +1,50 @@
 import pytest
 import os
+import asyncio
+import faiss
+import numpy as np
 from unittest.mock import MagicMock, patch
 from langchain.schema import Document
 from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_core.embeddings import DeterministicFakeEmbedding
 
 from services.rag import RAGRetriever, ContextBuilder, RetrievalConfig
 
-class TestRAGRetriever:
+@pytest.fixture(scope="module")
+def mock_vector_store():
+    mock_store = MagicMock(spec=FAISS)
     
-    @pytest.fixture
-    def mock_vector_store(self):
-        mock_store = MagicMock(spec=FAISS)
-        
-        sample_docs = [
-            (Document(page_content="Software engineer with 5 years experience", 
-                     metadata={"source": "job_description", "chunk_id": 0}), 0.9),
-            (Document(page_content="Python, Java, React development skills", 
-                     metadata={"source": "superset", "chunk_id": 1}), 0.8),
-            (Document(page_content="Led team of 10 developers on major project", 
-                     metadata={"source": "superset", "chunk_id": 2}), 0.7)
-        ]
-        
-        mock_store.similarity_search_with_score.return_value = sample_docs
-        return mock_store
+    sample_docs = [
+        (Document(page_content="Software engineer with 5 years experience", 
+                 metadata={"source": "job_description", "chunk_id": 0}), 0.9),
+        (Document(page_content="Python, Java, React development skills", 
+                 metadata={"source": "superset", "chunk_id": 1}), 0.8),
+        (Document(page_content="Led team of 10 developers on major project", 
+                 metadata={"source": "superset", "chunk_id": 2}), 0.7)
+    ]
     
-    @pytest.fixture
-    def retriever(self, mock_vector_store):
-        config = RetrievalConfig(k=10, score_threshold=0.7)
-        return RAGRetriever(mock_vector_store, config)
+    mock_store.similarity_search_with_score.return_value = sample_docs
+    return mock_store
+
+@pytest.fixture(scope="module")
+def retriever(mock_vector_store):
+    config = RetrievalConfig(k=10, score_threshold=0.7)
+    return RAGRetriever(mock_vector_store, config)
+
+@pytest.fixture(scope="module")
+def faiss_store():
+    documents = [
+        Document(page_content="Software engineer position requires Python and Java skills",
+                 metadata={"source": "job_description", "chunk_id": 0}),
+        Document(page_content="5 years experience developing web applications with React",
+                 metadata={"source": "superset", "chunk_id": 1}),
+        Document(page_content="Led development team of 8 engineers on microservices project",
+                 metadata={"source": "superset", "chunk_id": 2})
+    ]
+    return FAISS.from_documents(documents, DeterministicFakeEmbedding(size=16))
+
+class TestRAGRetriever:
     
     def test_retrieve_context_basic(self, retriever):
         result = retriever.retrieve_context("software engineer skills")
@@ -45,14 +62,14 @@ class TestRAGRetriever:
         for doc, score in result["source_docs"]:
             assert doc.metadata["source"] == "superset"
     
-    def test_filter_by_relevance(self, retriever, mock_vector_store):
+    def test_filter_by_relevance(self, retriever, mock_vector_store, monkeypatch):
         # Test that low-scoring documents are filtered out
         low_score_docs = [
             (Document(page_content="test", metadata={"source": "test"}), 0.9),
             (Document(page_content="test", metadata={"source": "test"}), 0.5),
             (Document(page_content="test", metadata={"source": "test"}), 0.3)
         ]
-        mock_vector_store.similarity_search_with_score.return_value = low_score_docs
+        monkeypatch.setattr(mock_vector_store.similarity_search_with_score, "return_value", low_score_docs)
         
         filtered = retriever._filter_by_relevance(low_score_docs)
         assert len(filtered) == 2
@@ -71,6 +88,14 @@ class TestRAGRetriever:
         contents = [doc.page_content for doc, _ in diverse_docs]
         assert len(set(contents)) == 2
     
+    def test_ensure_diversity_ignores_whitespace_differences(self, retriever):
+        docs = [
+            (Document(page_content="Led  a team\nof engineers", metadata={"source": "test"}), 0.9),
+            (Document(page_content="Led a team of engineers ", metadata={"source": "test"}), 0.8)
+        ]
+        
+        assert len(retriever._ensure_diversity(docs)) == 1
+    
     def test_build_context_string(self, retriever):
         docs_with_scores = [
             (Document(page_content="First content", 
@@ -123,6 +148,114 @@ class TestRAGRetriever:
         assert "queries_used" in result
         assert result["queries_used"][0] == "Python programming"
 
+class TestBatchRetrieval:
+    
+    @pytest.fixture
+    def retriever(self, faiss_store):
+        return RAGRetriever(faiss_store, RetrievalConfig(k=3, score_threshold=0.0))
+    
+    def test_batch_matches_per_query_search(self, retriever, faiss_store):
+        queries = ["python skills", "team leadership"]
+        
+        batch_results = retriever._search_batch(queries)
+        
+        for query, results in zip(queries, batch_results):
+            expected = faiss_store.similarity_search_with_score(query, k=3)
+            assert [doc.page_content for doc, _ in results] == [doc.page_content for doc, _ in expected]
+            assert [score for _, score in results] == pytest.approx([score for _, score in expected])
+    
+    def test_batch_embeds_all_queries_in_one_call(self, retriever, faiss_store):
+        with patch.object(DeterministicFakeEmbedding, "embed_documents", autospec=True,
+                          side_effect=DeterministicFakeEmbedding.embed_documents) as embed_documents:
+            results = retriever.retrieve_context_batch(["python skills", "", "team leadership"])
+        
+        embed_documents.assert_called_once_with(faiss_store.embeddings, ["python skills", "team leadership"])
+        assert len(results) == 2
+        assert all(result["total_retrieved"] == 3 for result in results)
+    
+    def test_repeated_queries_reuse_cached_embeddings(self, retriever):
+        retriever.get_jd_specific_context()
+        
+        with patch.object(DeterministicFakeEmbedding, "embed_documents", autospec=True,
+                          side_effect=DeterministicFakeEmbedding.embed_documents) as embed_documents:
+            result = retriever.get_jd_specific_context()
+        
+        embed_documents.assert_not_called()
+        assert result["final_count"] > 0
+
+    def test_dedupe_queries_skips_near_duplicate_embeddings(self, retriever):
+        retriever._query_vectors.update({
+            "job requirements": np.array([1.0, 0.0], dtype=np.float32),
+            "job requirements qualifications": np.array([2.0, 0.1], dtype=np.float32),
+            "team culture": np.array([0.0, 1.0], dtype=np.float32)
+        })
+        
+        queries = ["job requirements", "job requirements qualifications", "team culture", "team culture"]
+        assert retriever._dedupe_queries(queries) == ["job requirements", "team culture"]
+    
+    def test_failing_embedder_returns_empty_context(self, retriever):
+        with patch.object(DeterministicFakeEmbedding, "embed_documents", side_effect=RuntimeError("embedding API down")):
+            result = retriever.get_jd_specific_context()
+        
+        assert result["queries_used"] == list(RAGRetriever._DEFAULT_JD_QUERIES)
+        assert result["final_count"] == 0
+        assert result["context"] == ""
+    
+    def test_dedupe_queries_without_embeddings_keeps_queries(self):
+        store = MagicMock(spec=FAISS)
+        store.index = MagicMock()
+        store.embeddings = None
+        retriever = RAGRetriever(store, RetrievalConfig())
+        
+        assert retriever._dedupe_queries(["python skills", "python skills", "team leadership"]) == [
+            "python skills", "team leadership"
+        ]
+    
+    def test_ensure_diversity_drops_near_duplicate_vectors(self, retriever, faiss_store):
+        hits = faiss_store.similarity_search_with_score("python skills", k=3)
+        vectors = retriever._get_doc_vectors([doc for doc, _ in hits])
+        
+        assert vectors.shape == (3, 16)
+        
+        retriever.config.diversity_threshold = -1.0
+        assert len(retriever._ensure_diversity(hits)) == 1
+        
+        retriever.config.diversity_threshold = 1.01
+        assert len(retriever._ensure_diversity(hits)) == 3
+
+    def test_hnsw_index_uses_configured_ef_search(self):
+        embeddings = DeterministicFakeEmbedding(size=16)
+        index = faiss.IndexHNSWFlat(16, 32)
+        store = FAISS(embedding_function=embeddings, index=index,
+                      docstore=InMemoryDocstore(), index_to_docstore_id={})
+        store.add_texts(["Python developer", "Team leadership"],
+                        metadatas=[{"source": "superset"}, {"source": "superset"}])
+        
+        retriever = RAGRetriever(store, RetrievalConfig(k=2, score_threshold=0.0, ef_search=48))
+        
+        assert index.hnsw.efSearch == 48
+        assert len(retriever._search_batch(["python"])[0]) == 2
+    
+    def test_quantized_refine_index_uses_configured_search_params(self):
+        embeddings = DeterministicFakeEmbedding(size=16)
+        base_index = faiss.IndexHNSWSQ(16, faiss.ScalarQuantizer.QT_8bit, 32)
+        index = faiss.IndexRefineFlat(base_index)
+        texts = ["Python developer", "Team leadership", "Cloud architecture"]
+        vectors = embeddings.embed_documents(texts)
+        index.train(np.asarray(vectors, dtype=np.float32))
+        store = FAISS(embedding_function=embeddings, index=index,
+                      docstore=InMemoryDocstore(), index_to_docstore_id={})
+        store.add_embeddings(zip(texts, vectors), metadatas=[{"source": "superset"}] * 3)
+        
+        retriever = RAGRetriever(store, RetrievalConfig(k=2, score_threshold=0.0,
+                                                        ef_search=48, refine_k_factor=3.0))
+        
+        assert index.k_factor == 3.0
+        assert faiss.downcast_index(index.base_index).hnsw.efSearch == 48
+        hits = retriever._search_batch(["Python developer"])[0]
+        assert hits[0][0].page_content == "Python developer"
+        assert hits[0][1] == pytest.approx(0.0, abs=1e-5)
+
 class TestContextBuilder:
     
     @pytest.fixture
@@ -160,6 +293,15 @@ class TestContextBuilder:
         mock_retriever.get_jd_specific_context.assert_called_once()
         mock_retriever.get_superset_context.assert_called_once()
     
+    def test_build_cv_generation_context_inside_running_loop(self, context_builder):
+        async def build_from_coroutine():
+            return context_builder.build_cv_generation_context()
+        
+        context = asyncio.run(build_from_coroutine())
+        
+        assert "Job requires Python and React skills" in context
+        assert "Candidate has 5 years Python experience" in context
+    
     def test_build_cover_letter_context(self, context_builder, mock_retriever):
         context = context_builder.build_cover_letter_context("TechCorp")
         
@@ -196,6 +338,9 @@ class TestRetrievalConfig:
         assert config.score_threshold == 0.7
         assert config.diversity_threshold == 0.8
         assert config.max_context_length == 8000
+        assert config.ef_search == 64
+        assert config.refine_k_factor == 4.0
+        assert config.query_dedup_threshold == 0.95
     
     def test_custom_config(self):
         config = RetrievalConfig(
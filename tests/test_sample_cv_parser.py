@@ -0,0 +1,61 @@
+import json
+import pytest
+from unittest.mock import MagicMock, patch
+
+from services.sample_cv_parser import SampleCVParser, SAMPLE_CV_RESPONSE_FORMAT
+
+SAMPLE_CV = {
+    "contact": {"name": "Jane Doe", "email": "jane@example.com", "phone": "555 0100",
+                "location": "London, UK", "linkedin": None, "website": None},
+    "professional_summary": "Platform engineer focused on reliable payments infrastructure.",
+    "skills": ["Python", "Kubernetes"],
+    "experience": [{
+        "company": "Acme", "position": "Senior Engineer", "location": "London, UK",
+        "start_date": "Jan 2021", "end_date": "Present", "duration": "3 years",
+        "achievements": ["Cut settlement latency by 40%"]
+    }]
+}
+
+def _completion(content, finish_reason="stop", refusal=None):
+    completion = MagicMock()
+    choice = completion.choices[0]
+    choice.message.content = content
+    choice.message.refusal = refusal
+    choice.finish_reason = finish_reason
+    return completion
+
+class TestStructuredSampleCVParsing:
+    
+    @pytest.fixture
+    def parser(self):
+        with patch("services.sample_cv_parser._get_openai_client", return_value=MagicMock()):
+            return SampleCVParser()
+    
+    def test_structured_reply_is_validated(self, parser):
+        parser.openai_client.chat.completions.create.return_value = _completion(json.dumps(SAMPLE_CV))
+        
+        result = parser.parse_sample_cv_to_json("Jane Doe, Senior Engineer at Acme")
+        
+        kwargs = parser.openai_client.chat.completions.create.call_args.kwargs
+        assert kwargs["response_format"] == SAMPLE_CV_RESPONSE_FORMAT
+        assert result["parsing_successful"]
+        assert result["cv_data"] == parser._validate_cv_structure(SAMPLE_CV)
+    
+    @pytest.mark.parametrize("structured_reply", [
+        _completion(None, refusal="I can't help with that."),
+        _completion(json.dumps(SAMPLE_CV)[:80], finish_reason="length"),
+        _completion("not json at all"),
+    ])
+    def test_unusable_structured_reply_falls_back_to_free_form(self, parser, structured_reply):
+        parser.openai_client.chat.completions.create.side_effect = [
+            structured_reply,
+            _completion("```json\n" + json.dumps(SAMPLE_CV) + "\n```"),
+        ]
+        
+        result = parser.parse_sample_cv_to_json("Jane Doe, Senior Engineer at Acme")
+        
+        fallback_kwargs = parser.openai_client.chat.completions.create.call_args.kwargs
+        assert "response_format" not in fallback_kwargs
+        assert result["parsing_successful"]
+        assert result["cv_data"]["contact"]["name"] == "Jane Doe"
+        assert result["cv_data"] == parser._validate_cv_structure(SAMPLE_CV)
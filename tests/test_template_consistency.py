@@ -3,21 +3,88 @@ Tests to ensure CV preview and PDF content are identical and consistent.
 These tests prevent regressions and guarantee template consistency.
 """
 
+import functools
+import os
 import unittest
 import re
-from unittest.mock import Mock
-from datetime import datetime
+from copy import deepcopy
+from dataclasses import replace
+from unittest.mock import Mock, patch
 
-from services.template_engine import template_engine
+try:
+    import ahocorasick
+except ImportError:  # optional speedup; falls back to per-needle substring checks
+    ahocorasick = None
+
+from jinja2 import FileSystemBytecodeCache
+
+from services.template_engine import TemplateEngine
 from models.cv_data import CVData, ContactInfo, RoleExperience, ExperienceBullet
 
+# Compiled templates persist in the per-user temp directory, so repeat runs skip parsing
+template_engine = TemplateEngine(bytecode_cache=FileSystemBytecodeCache())
+
+# Markup stripped before comparing preview and PDF text
+_RX_BOLD = re.compile(r'\*\*([^*]+)\*\*')
+_RX_ITAL = re.compile(r'\*([^*]+)\*')
+_RX_HDR = re.compile(r'#+\s*')
+_RX_SEP = re.compile(r'---+')
+_RX_EQ = re.compile(r'=+')
+_RX_WS = re.compile(r'\s+')
+
+# Leftover placeholders or unrendered values that must never reach a CV
+_PLACEHOLDER_RX = re.compile(r'\*{4}|\{\{ |\}\}|undefined|None|null')
+
+# Filler text a generated section must not contain
+_PLACEHOLDER_TEXT_RX = re.compile('|'.join(map(re.escape, [
+    'TODO', 'PLACEHOLDER', 'TBD', 'TBA', 'XXX',
+    '{{ ', '}}', 'undefined', 'null', 'None',
+    '[FILL IN]', '[INSERT]', '[REPLACE]', '____',
+    'Lorem ipsum', 'Sample text', 'Example content'
+])))
+
+# Section headers shared by both templates, in render order
+_SECTION_HEADERS = ("PROFESSIONAL SUMMARY", "CORE SKILLS", "PROFESSIONAL EXPERIENCE", "ADDITIONAL INFORMATION")
+
+# Mandatory sections and the sample CV values each must contain in both renders
+_SECTION_EXPECTATIONS = (
+    ("PROFESSIONAL SUMMARY", lambda cv_data: [cv_data.professional_summary]),
+    ("CORE SKILLS", lambda cv_data: cv_data.skills[:3]),
+    ("PROFESSIONAL EXPERIENCE", lambda cv_data: [cv_data.current_role.job_title]),
+)
+
+
+def _found_needles(content: str, needles) -> set:
+    """Needles occurring in content, found in a single pass when pyahocorasick is installed"""
+    needles = set(needles)
+    if ahocorasick is None or not needles:
+        return {needle for needle in needles if needle in content}
+    automaton = ahocorasick.Automaton()
+    for needle in needles:
+        automaton.add_word(needle, needle)
+    automaton.make_automaton()
+    return {needle for _, needle in automaton.iter(content)}
+
+
+@functools.cache
+def _load_app_integration():
+    """Import the app's session-to-CVData entry point once; app pulls in the whole export stack"""
+    from exporters.pdf_export import PDFExporter  # imported so a missing PDF stack skips the test
+    from app import convert_session_to_cvdata
+    return convert_session_to_cvdata
+
 
 class TestTemplateConsistency(unittest.TestCase):
-    """Test suite ensuring CV preview and PDF templates produce consistent content"""
+    """Test suite ensuring CV preview and PDF templates produce consistent content
 
-    def setUp(self):
-        """Set up test data"""
-        self.sample_contact = ContactInfo(
+    Fixtures and renders are built once in setUpClass and only read by tests,
+    so the suite is safe to distribute with pytest-xdist (``pytest -n auto``).
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up shared test data; no test mutates it"""
+        cls.sample_contact = ContactInfo(
             name="John Doe",
             email="john.doe@example.com", 
             phone="+1-555-123-4567",
@@ -26,22 +93,22 @@ class TestTemplateConsistency(unittest.TestCase):
             website="https://johndoe.dev"
         )
         
-        self.sample_bullets = [
+        cls.sample_bullets = [
             ExperienceBullet(heading="Leadership", content="Led a team of 5 engineers to deliver critical features"),
             ExperienceBullet(heading="Performance", content="Improved system performance by 40% through optimization"),
             ExperienceBullet(heading="Innovation", content="Architected microservices reducing deployment time by 60%")
         ]
         
-        self.sample_current_role = RoleExperience(
+        cls.sample_current_role = RoleExperience(
             job_title="Senior Software Engineer",
             company="TechCorp Inc",
             location="San Francisco, CA", 
             start_date="Jan 2022",
             end_date="Present",
-            bullets=self.sample_bullets
+            bullets=cls.sample_bullets
         )
         
-        self.sample_previous_roles = [
+        cls.sample_previous_roles = [
             RoleExperience(
                 job_title="Software Engineer",
                 company="StartupXYZ",
@@ -66,19 +133,55 @@ class TestTemplateConsistency(unittest.TestCase):
             )
         ]
         
-        self.sample_cv_data = CVData(
-            contact=self.sample_contact,
+        cls.sample_cv_data = CVData(
+            contact=cls.sample_contact,
             professional_summary="Experienced software engineer with 5+ years of expertise in full-stack development, cloud architecture, and team leadership. Proven track record of delivering scalable solutions and driving innovation in fast-paced environments.",
             skills=["Python", "JavaScript", "React", "Node.js", "AWS", "Docker", "PostgreSQL", "Redis"],
-            current_role=self.sample_current_role,
-            previous_roles=self.sample_previous_roles,
+            current_role=cls.sample_current_role,
+            previous_roles=cls.sample_previous_roles,
             additional_info="Available for remote work. Open source contributor with 500+ GitHub stars.",
-            generated_at=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            generated_at="2024-01-01 00:00:00"
         )
+        
+        # Every test that checks the sample CV reads the same renders and context
+        cls._preview_content = template_engine.render_cv_preview(cls.sample_cv_data)
+        cls._pdf_content = template_engine.render_cv_for_pdf(cls.sample_cv_data)
+        cls._unified_context = template_engine._create_unified_context(cls.sample_cv_data)
+        
+        # Session state for the app integration test
+        cls._mock_session_state = {
+            'whole_cv_contact': {
+                'name': cls.sample_contact.name,
+                'email': cls.sample_contact.email,
+                'phone': cls.sample_contact.phone,
+                'location': cls.sample_contact.location,
+                'linkedin': cls.sample_contact.linkedin,
+                'website': cls.sample_contact.website
+            },
+            'individual_generations': {
+                'executive_summary': 'Senior Engineering Manager with 8+ years leading cross-functional teams.',
+                'top_skills': '**Cloud Architecture** | **Team Leadership** | **Python Development** | **Strategic Planning** | **DevOps Practices**'
+            },
+            'llm_json_responses': {
+                'experience_bullets': {
+                    'role_data': {
+                        'position_name': 'Senior Software Engineer',
+                        'company_name': 'TechCorp Inc',
+                        'location': 'San Francisco, CA',
+                        'start_date': 'Jan 2022',
+                        'end_date': 'Present'
+                    },
+                    'optimized_bullets': [
+                        '**Leadership** | Led a team of 5 engineers to deliver critical features',
+                        '**Performance** | Improved system performance by 40% through optimization'
+                    ]
+                }
+            }
+        }
 
     def test_unified_context_provides_both_field_formats(self):
         """Test that unified context provides both preview and PDF field formats"""
-        context = template_engine._create_unified_context(self.sample_cv_data)
+        context = self._unified_context
         
         # Check current role has both field name formats
         current_role = context['current_role']
@@ -100,7 +203,7 @@ class TestTemplateConsistency(unittest.TestCase):
 
     def test_previous_roles_have_both_field_formats(self):
         """Test that previous roles contain both field name formats"""
-        context = template_engine._create_unified_context(self.sample_cv_data)
+        context = self._unified_context
         
         for i, role in enumerate(context['previous_roles']):
             expected_role = self.sample_previous_roles[i]
@@ -121,102 +224,98 @@ class TestTemplateConsistency(unittest.TestCase):
 
     def test_core_content_consistency_between_templates(self):
         """Test that core content (skills, summary, etc.) is identical between templates"""
-        preview_content = template_engine.render_cv_preview(self.sample_cv_data)
-        pdf_content = template_engine.render_cv_for_pdf(self.sample_cv_data)
+        preview_content = self._preview_content
+        pdf_content = self._pdf_content
         
         # Clean both contents for comparison (remove markdown formatting and extra whitespace)
         clean_preview = self._clean_content_for_comparison(preview_content)
         clean_pdf = self._clean_content_for_comparison(pdf_content)
         
         # Extract and compare key sections
-        self._assert_section_consistency(clean_preview, clean_pdf, "PROFESSIONAL SUMMARY")
-        self._assert_section_consistency(clean_preview, clean_pdf, "CORE SKILLS") 
-        self._assert_section_consistency(clean_preview, clean_pdf, "PROFESSIONAL EXPERIENCE")
-        
-    def test_contact_info_consistency(self):
-        """Test that contact information is identical between preview and PDF"""
-        preview_content = template_engine.render_cv_preview(self.sample_cv_data)
-        pdf_content = template_engine.render_cv_for_pdf(self.sample_cv_data)
-        
-        # Check that both contain the same contact elements
-        for contact_item in [self.sample_contact.name, self.sample_contact.email, 
-                           self.sample_contact.phone, self.sample_contact.location]:
-            self.assertIn(contact_item, preview_content)
-            self.assertIn(contact_item, pdf_content)
-
-    def test_skills_formatting_consistency(self):
-        """Test that skills are formatted consistently between templates"""
-        preview_content = template_engine.render_cv_preview(self.sample_cv_data)
-        pdf_content = template_engine.render_cv_for_pdf(self.sample_cv_data)
-        
-        # Verify all skills appear in both formats
-        for skill in self.sample_cv_data.skills:
-            self.assertIn(skill, preview_content, f"Skill '{skill}' missing from preview")
-            self.assertIn(skill, pdf_content, f"Skill '{skill}' missing from PDF")
-
-    def test_job_titles_and_companies_consistency(self):
-        """Test that job titles and company names are identical between templates"""
-        preview_content = template_engine.render_cv_preview(self.sample_cv_data)
-        pdf_content = template_engine.render_cv_for_pdf(self.sample_cv_data)
-        
-        # Check current role
-        self.assertIn(self.sample_current_role.job_title, preview_content)
-        self.assertIn(self.sample_current_role.job_title, pdf_content)
-        self.assertIn(self.sample_current_role.company, preview_content)
-        self.assertIn(self.sample_current_role.company, pdf_content)
-        
-        # Check previous roles
-        for role in self.sample_previous_roles:
-            self.assertIn(role.job_title, preview_content)
-            self.assertIn(role.job_title, pdf_content)
-            self.assertIn(role.company, preview_content)
-            self.assertIn(role.company, pdf_content)
-
-    def test_bullet_points_consistency(self):
-        """Test that bullet points content is consistent between templates"""
-        preview_content = template_engine.render_cv_preview(self.sample_cv_data)
-        pdf_content = template_engine.render_cv_for_pdf(self.sample_cv_data)
-        
-        # Check current role bullets
-        for bullet in self.sample_current_role.bullets:
-            # Remove markdown formatting for comparison
-            bullet_text = bullet.content
-            self.assertIn(bullet_text, preview_content)
-            self.assertIn(bullet_text, pdf_content)
-        
-        # Check previous role bullets
-        for role in self.sample_previous_roles:
-            for bullet in role.bullets:
-                bullet_text = bullet.content
-                self.assertIn(bullet_text, preview_content)
-                self.assertIn(bullet_text, pdf_content)
+        self._assert_section_consistency(clean_preview, clean_pdf,
+                                         "PROFESSIONAL SUMMARY", "CORE SKILLS", "PROFESSIONAL EXPERIENCE")
+        
+    def test_expected_content_in_both_templates(self):
+        """Test that contact details, skills, roles, bullets and additional info appear in both templates"""
+        preview_content = self._preview_content
+        pdf_content = self._pdf_content
+        
+        contact = self.sample_contact
+        roles = [self.sample_current_role, *self.sample_previous_roles]
+        expected_content = {
+            'contact': [contact.name, contact.email, contact.phone, contact.location],
+            'skills': self.sample_cv_data.skills,
+            'job titles and companies': [text for role in roles for text in (role.job_title, role.company)],
+            # Bullets are compared without markdown formatting
+            'bullets': [bullet.content for role in roles for bullet in role.bullets],
+            'additional info': [self.sample_cv_data.additional_info] if self.sample_cv_data.additional_info else [],
+        }
+        
+        for label, needles in expected_content.items():
+            with self.subTest(label):
+                self.assertEqual(self._missing(preview_content, needles), [], f"{label} missing from preview")
+                self.assertEqual(self._missing(pdf_content, needles), [], f"{label} missing from PDF")
 
     def test_no_missing_placeholder_values(self):
         """Test that there are no missing placeholder values like **** or empty fields"""
-        preview_content = template_engine.render_cv_preview(self.sample_cv_data)
-        pdf_content = template_engine.render_cv_for_pdf(self.sample_cv_data)
+        preview_content = self._preview_content
+        pdf_content = self._pdf_content
         
         # Check for common placeholder issues
-        problematic_patterns = ['****', '{{ ', '}}', 'undefined', 'None', 'null']
-        
-        for pattern in problematic_patterns:
-            self.assertNotIn(pattern, preview_content, 
-                           f"Found problematic pattern '{pattern}' in preview content")
-            self.assertNotIn(pattern, pdf_content,
-                           f"Found problematic pattern '{pattern}' in PDF content")
+        self.assertEqual(_PLACEHOLDER_RX.findall(preview_content), [],
+                         "Found problematic patterns in preview content")
+        self.assertEqual(_PLACEHOLDER_RX.findall(pdf_content), [],
+                         "Found problematic patterns in PDF content")
 
-    def test_additional_info_consistency(self):
-        """Test that additional information section is consistent"""
-        preview_content = template_engine.render_cv_preview(self.sample_cv_data)
-        pdf_content = template_engine.render_cv_for_pdf(self.sample_cv_data)
-        
-        if self.sample_cv_data.additional_info:
-            self.assertIn(self.sample_cv_data.additional_info, preview_content)
-            self.assertIn(self.sample_cv_data.additional_info, pdf_content)
+    def test_render_cache_tracks_cv_changes(self):
+        """Test that unchanged CV data reuses its render and edited CV data is rendered afresh"""
+        self.assertEqual(template_engine.render_cv_preview(self.sample_cv_data), self._preview_content)
+        
+        # A new timestamp alone reuses the cached body and only swaps the generated_at line
+        restamped_cv_data = replace(self.sample_cv_data, generated_at="2024-02-02 09:30:00")
+        with patch.object(template_engine.env, 'get_template', wraps=template_engine.env.get_template) as get_template:
+            restamped_content = template_engine.render_cv_preview(restamped_cv_data)
+        get_template.assert_not_called()
+        self.assertEqual(restamped_content,
+                         self._preview_content.replace(self.sample_cv_data.generated_at, "2024-02-02 09:30:00"))
+        
+        edited_cv_data = replace(self.sample_cv_data, professional_summary="Edited summary for a new role.")
+        edited_content = template_engine.render_cv_preview(edited_cv_data)
+        self.assertIn("Edited summary for a new role.", edited_content)
+        self.assertNotIn(self.sample_cv_data.professional_summary, edited_content)
+        
+        # In-place edits to the same CVData object must not be served from the cache either
+        cv_data = deepcopy(self.sample_cv_data)
+        self.assertEqual(template_engine.render_cv_preview(cv_data), self._preview_content)
+        cv_data.current_role.bullets[0].content = "Cut deploy time from hours to minutes"
+        cv_data.previous_roles[0].start_date = "Apr 2020"
+        cv_data.previous_roles[0].end_date = "Nov 2021"
+        
+        for content in (template_engine.render_cv_preview(cv_data), template_engine.render_cv_for_pdf(cv_data)):
+            self.assertIn("Cut deploy time from hours to minutes", content)
+            self.assertIn("Apr 2020", content)
+            self.assertIn("Nov 2021", content)
+            self.assertNotIn("Mar 2020", content)
+
+    def test_render_reflects_in_place_bullet_edits(self):
+        """Test that bullets edited after a render show up in the next render"""
+        cv_data = deepcopy(self.sample_cv_data)
+        role = cv_data.current_role
+        template_engine.render_cv_preview(cv_data)
+        template_engine.render_cv_for_pdf(cv_data)
+        self.assertEqual(len(role.to_dict()['bullets']), len(role.bullets))
+        
+        role.bullets[0].content = "Rewrote the billing pipeline in Rust"
+        role.bullets.append(ExperienceBullet(heading="Mentoring", content="Coached four junior engineers to promotion"))
+        
+        for content in (template_engine.render_cv_preview(cv_data), template_engine.render_cv_for_pdf(cv_data)):
+            self.assertIn("Rewrote the billing pipeline in Rust", content)
+            self.assertIn("Coached four junior engineers to promotion", content)
+        self.assertEqual(role.to_dict()['bullets'], [bullet.to_formatted_string() for bullet in role.bullets])
 
     def test_template_context_field_coverage(self):
         """Test that unified context provides all necessary fields for both templates"""
-        context = template_engine._create_unified_context(self.sample_cv_data)
+        context = self._unified_context
         
         # Required base fields
         required_fields = ['contact', 'professional_summary', 'skills', 'current_role', 
@@ -233,99 +332,64 @@ class TestTemplateConsistency(unittest.TestCase):
             self.assertIn(field, context['current_role'], 
                          f"Missing current_role field: {field}")
 
+    def _missing(self, content: str, needles) -> list:
+        """Needles absent from content, in the order given"""
+        found = _found_needles(content, needles)
+        return [needle for needle in needles if needle not in found]
+
     def _clean_content_for_comparison(self, content: str) -> str:
         """Clean content by removing markdown, extra whitespace, and formatting"""
         # Remove markdown formatting
-        cleaned = re.sub(r'\*\*([^*]+)\*\*', r'\1', content)  # Remove **bold**
-        cleaned = re.sub(r'\*([^*]+)\*', r'\1', cleaned)      # Remove *italic*
-        cleaned = re.sub(r'#+\s*', '', cleaned)               # Remove headers
-        cleaned = re.sub(r'---+', '', cleaned)                # Remove separators
-        cleaned = re.sub(r'=+', '', cleaned)                  # Remove PDF separators
+        cleaned = _RX_BOLD.sub(r'\1', content)    # Remove **bold**
+        cleaned = _RX_ITAL.sub(r'\1', cleaned)    # Remove *italic*
+        cleaned = _RX_HDR.sub('', cleaned)        # Remove headers
+        cleaned = _RX_SEP.sub('', cleaned)        # Remove separators
+        cleaned = _RX_EQ.sub('', cleaned)         # Remove PDF separators
         
         # Normalize whitespace
-        cleaned = re.sub(r'\s+', ' ', cleaned)
+        cleaned = _RX_WS.sub(' ', cleaned)
         cleaned = cleaned.strip()
         
         return cleaned
 
-    def _assert_section_consistency(self, preview_content: str, pdf_content: str, section_name: str):
-        """Assert that a specific section has consistent content between preview and PDF"""
-        preview_section = self._extract_section(preview_content, section_name)
-        pdf_section = self._extract_section(pdf_content, section_name)
-        
-        self.assertIsNotNone(preview_section, f"Section '{section_name}' not found in preview")
-        self.assertIsNotNone(pdf_section, f"Section '{section_name}' not found in PDF")
-        
-        # Compare core content (allowing for format differences)
-        self.assertGreater(len(preview_section), 10, f"Preview section '{section_name}' too short")
-        self.assertGreater(len(pdf_section), 10, f"PDF section '{section_name}' too short")
+    def _assert_section_consistency(self, preview_content: str, pdf_content: str, *section_names: str):
+        """Assert that each named section has consistent content between preview and PDF"""
+        # Upper-case each content once and reuse it for every section lookup
+        preview_upper = preview_content.upper()
+        pdf_upper = pdf_content.upper()
+        
+        for section_name in section_names:
+            preview_section = self._extract_section(preview_content, preview_upper, section_name)
+            pdf_section = self._extract_section(pdf_content, pdf_upper, section_name)
+            
+            self.assertIsNotNone(preview_section, f"Section '{section_name}' not found in preview")
+            self.assertIsNotNone(pdf_section, f"Section '{section_name}' not found in PDF")
+            
+            # Compare core content (allowing for format differences)
+            self.assertGreater(len(preview_section), 10, f"Preview section '{section_name}' too short")
+            self.assertGreater(len(pdf_section), 10, f"PDF section '{section_name}' too short")
 
-    def _extract_section(self, content: str, section_name: str) -> str:
-        """Extract a specific section from content"""
-        # Look for section header and extract content until next section
-        pattern = rf'{section_name}[\s\S]*?(?=(?:[A-Z\s]+$|$))'
-        match = re.search(pattern, content, re.MULTILINE | re.IGNORECASE)
-        return match.group(0) if match else None
+    def _extract_section(self, content: str, upper: str, section_name: str) -> str:
+        """Extract a specific section from content, located via its upper-cased view"""
+        # Look for section header and extract content until the next known header
+        start = upper.find(section_name.upper())
+        if start < 0:
+            return None
+        
+        body_start = start + len(section_name)
+        ends = [index for index in (upper.find(header, body_start) for header in _SECTION_HEADERS) if index >= 0]
+        return content[start:min(ends, default=len(content))]
 
 
+    @unittest.skipUnless(os.environ.get("RUN_INTEGRATION") == "1", "integration test; set RUN_INTEGRATION=1")
     def test_actual_pdf_generation_consistency(self):
         """Test that actual PDF generation uses template engine and matches preview content"""
         try:
             # Import PDF exporter and app functions
-            from exporters.pdf_export import PDFExporter
-            from app import convert_session_to_cvdata, generate_template_based_cv_pdf
-            import streamlit as st
-            import os
-            import tempfile
-            
-            # Mock session state with our test data
-            mock_session_state = {
-                'whole_cv_contact': {
-                    'name': self.sample_contact.name,
-                    'email': self.sample_contact.email,
-                    'phone': self.sample_contact.phone,
-                    'location': self.sample_contact.location,
-                    'linkedin': self.sample_contact.linkedin,
-                    'website': self.sample_contact.website
-                },
-                'individual_generations': {
-                    'executive_summary': 'Senior Engineering Manager with 8+ years leading cross-functional teams.',
-                    'top_skills': '**Cloud Architecture** | **Team Leadership** | **Python Development** | **Strategic Planning** | **DevOps Practices**'
-                },
-                'llm_json_responses': {
-                    'experience_bullets': {
-                        'role_data': {
-                            'position_name': 'Senior Software Engineer',
-                            'company_name': 'TechCorp Inc',
-                            'location': 'San Francisco, CA',
-                            'start_date': 'Jan 2022',
-                            'end_date': 'Present'
-                        },
-                        'optimized_bullets': [
-                            '**Leadership** | Led a team of 5 engineers to deliver critical features',
-                            '**Performance** | Improved system performance by 40% through optimization'
-                        ]
-                    }
-                }
-            }
+            convert_session_to_cvdata = _load_app_integration()
             
-            # Mock streamlit session state
-            import sys
-            if 'streamlit' not in sys.modules:
-                # Create mock streamlit module
-                import types
-                streamlit_mock = types.ModuleType('streamlit')
-                streamlit_mock.session_state = types.SimpleNamespace()
-                for key, value in mock_session_state.items():
-                    setattr(streamlit_mock.session_state, key, value)
-                sys.modules['streamlit'] = streamlit_mock
-            else:
-                # Update existing streamlit module
-                for key, value in mock_session_state.items():
-                    setattr(st.session_state, key, value)
-            
-            # Test CVData conversion
-            cv_data = convert_session_to_cvdata()
+            # Test CVData conversion straight from our session data, no streamlit session needed
+            cv_data = convert_session_to_cvdata(self._mock_session_state)
             
             # Verify CVData has skills populated
             self.assertGreater(len(cv_data.skills), 0, "CVData should have skills populated")
@@ -351,8 +415,8 @@ class TestTemplateConsistency(unittest.TestCase):
 
     def test_mandatory_sections_have_substantial_data(self):
         """Test that all mandatory sections contain substantial data, not just headers"""
-        preview_content = template_engine.render_cv_preview(self.sample_cv_data)
-        pdf_content = template_engine.render_cv_for_pdf(self.sample_cv_data)
+        preview_content = self._preview_content
+        pdf_content = self._pdf_content
         
         # Professional Summary must have meaningful content (min 20 chars)
         self.assertGreater(len(self.sample_cv_data.professional_summary.strip()), 20,
@@ -363,8 +427,8 @@ class TestTemplateConsistency(unittest.TestCase):
         # Core Skills must have multiple skills (min 3)
         self.assertGreaterEqual(len(self.sample_cv_data.skills), 3, 
                                "Should have at least 3 skills")
-        skills_in_preview = sum(1 for skill in self.sample_cv_data.skills if skill in preview_content)
-        skills_in_pdf = sum(1 for skill in self.sample_cv_data.skills if skill in pdf_content)
+        skills_in_preview = len(_found_needles(preview_content, self.sample_cv_data.skills))
+        skills_in_pdf = len(_found_needles(pdf_content, self.sample_cv_data.skills))
         self.assertGreaterEqual(skills_in_preview, 3, "Preview should contain at least 3 skills")
         self.assertGreaterEqual(skills_in_pdf, 3, "PDF should contain at least 3 skills")
         
@@ -387,8 +451,8 @@ class TestTemplateConsistency(unittest.TestCase):
 
     def test_content_quality_and_consistency_comprehensive(self):
         """Comprehensive test for content quality and consistency between formats"""
-        preview_content = template_engine.render_cv_preview(self.sample_cv_data)
-        pdf_content = template_engine.render_cv_for_pdf(self.sample_cv_data)
+        preview_content = self._preview_content
+        pdf_content = self._pdf_content
         
         # Test content quality metrics
         quality_checks = {
@@ -416,9 +480,8 @@ class TestTemplateConsistency(unittest.TestCase):
             'PROFESSIONAL EXPERIENCE'
         ]
         
-        for phrase in key_phrases:
-            self.assertIn(phrase, preview_content, f"Key phrase missing from preview: {phrase}")
-            self.assertIn(phrase, pdf_content, f"Key phrase missing from PDF: {phrase}")
+        self.assertEqual(self._missing(preview_content, key_phrases), [], "Key phrases missing from preview")
+        self.assertEqual(self._missing(pdf_content, key_phrases), [], "Key phrases missing from PDF")
             
         # Test that substantial content exists in both formats
         import re
@@ -440,12 +503,13 @@ class TestTemplateConsistency(unittest.TestCase):
 
     def test_previous_roles_content_quality(self):
         """Test that previous roles have substantial content in both formats"""
-        preview_content = template_engine.render_cv_preview(self.sample_cv_data)
-        pdf_content = template_engine.render_cv_for_pdf(self.sample_cv_data)
+        preview_content = self._preview_content
+        pdf_content = self._pdf_content
         
         self.assertGreater(len(self.sample_cv_data.previous_roles), 0, 
                           "Should have at least one previous role for comprehensive testing")
         
+        role_phrases = []
         for i, role in enumerate(self.sample_cv_data.previous_roles):
             # Each role should have substantial info
             self.assertTrue(role.job_title and len(role.job_title.strip()) > 0,
@@ -455,113 +519,60 @@ class TestTemplateConsistency(unittest.TestCase):
             self.assertGreater(len(role.bullets), 0,
                              f"Previous role {i} should have bullets")
             
-            # Content should appear in both formats
-            self.assertIn(role.job_title, preview_content,
-                         f"Previous role {i} title missing from preview")
-            self.assertIn(role.job_title, pdf_content,
-                         f"Previous role {i} title missing from PDF")
-            self.assertIn(role.company, preview_content,
-                         f"Previous role {i} company missing from preview")
-            self.assertIn(role.company, pdf_content,
-                         f"Previous role {i} company missing from PDF")
-            
             # Bullets should have meaningful content
             for j, bullet in enumerate(role.bullets):
                 self.assertGreater(len(bullet.content.strip()), 10,
                                  f"Previous role {i} bullet {j} should have substantial content")
-                self.assertIn(bullet.content, preview_content,
-                             f"Previous role {i} bullet {j} missing from preview")
-                self.assertIn(bullet.content, pdf_content,
-                             f"Previous role {i} bullet {j} missing from PDF")
+            
+            role_phrases += [role.job_title, role.company, *(bullet.content for bullet in role.bullets)]
+        
+        # Titles, companies and bullets should appear in both formats
+        self.assertEqual(self._missing(preview_content, role_phrases), [], "Previous role content missing from preview")
+        self.assertEqual(self._missing(pdf_content, role_phrases), [], "Previous role content missing from PDF")
 
     def test_formatting_consistency_detailed(self):
         """Test detailed formatting consistency between preview and PDF"""
-        preview_content = template_engine.render_cv_preview(self.sample_cv_data)
-        pdf_content = template_engine.render_cv_for_pdf(self.sample_cv_data)
+        preview_content = self._preview_content
+        pdf_content = self._pdf_content
         
         # Both should have proper section structure
-        section_headers = ['PROFESSIONAL SUMMARY', 'CORE SKILLS', 'PROFESSIONAL EXPERIENCE']
-        
-        for header in section_headers:
-            # Headers should exist in both
-            self.assertIn(header, preview_content, f"Header '{header}' missing from preview")
-            self.assertIn(header, pdf_content, f"Header '{header}' missing from PDF")
-            
-            # Extract section content (everything after header until next header or end)
-            import re
-            pattern = rf'{re.escape(header)}(.*?)(?=(?:PROFESSIONAL SUMMARY|CORE SKILLS|PROFESSIONAL EXPERIENCE|$))'
-            
-            preview_section = re.search(pattern, preview_content, re.DOTALL | re.IGNORECASE)
-            pdf_section = re.search(pattern, pdf_content, re.DOTALL | re.IGNORECASE)
-            
-            self.assertIsNotNone(preview_section, f"Could not extract '{header}' section from preview")
-            self.assertIsNotNone(pdf_section, f"Could not extract '{header}' section from PDF")
-            
-            # Sections should have substantial content (not just headers)
-            preview_section_content = preview_section.group(1).strip()
-            pdf_section_content = pdf_section.group(1).strip()
-            
-            self.assertGreater(len(preview_section_content), 10,
-                             f"Preview '{header}' section should have substantial content")
-            self.assertGreater(len(pdf_section_content), 10,
-                             f"PDF '{header}' section should have substantial content")
+        section_headers = [header for header, _ in _SECTION_EXPECTATIONS]
+        
+        # Headers should exist in both
+        self.assertEqual(self._missing(preview_content, section_headers), [], "Headers missing from preview")
+        self.assertEqual(self._missing(pdf_content, section_headers), [], "Headers missing from PDF")
+        
+        for format_name, content in (('preview', preview_content), ('PDF', pdf_content)):
+            upper = content.upper()
+            for header in section_headers:
+                with self.subTest(format=format_name, section=header):
+                    section = self._extract_section(content, upper, header)
+                    self.assertIsNotNone(section, f"Could not extract '{header}' section from {format_name}")
+                    
+                    # Sections should have substantial content (not just headers)
+                    self.assertGreater(len(section[len(header):].strip()), 10,
+                                       f"{format_name} '{header}' section should have substantial content")
 
     def test_no_empty_or_placeholder_sections(self):
         """Test that no sections are empty or contain placeholder text"""
-        preview_content = template_engine.render_cv_preview(self.sample_cv_data)
-        pdf_content = template_engine.render_cv_for_pdf(self.sample_cv_data)
+        preview_content = self._preview_content
+        pdf_content = self._pdf_content
         
         # Check for various placeholder patterns (exclude legitimate markdown formatting)
-        bad_patterns = [
-            'TODO', 'PLACEHOLDER', 'TBD', 'TBA', 'XXX',
-            '{{ ', '}}', 'undefined', 'null', 'None',
-            '[FILL IN]', '[INSERT]', '[REPLACE]', '____',
-            'Lorem ipsum', 'Sample text', 'Example content'
-        ]
-        
-        for pattern in bad_patterns:
-            self.assertNotIn(pattern, preview_content,
-                           f"Preview contains placeholder pattern: {pattern}")
-            self.assertNotIn(pattern, pdf_content,
-                           f"PDF contains placeholder pattern: {pattern}")
+        self.assertEqual(_PLACEHOLDER_TEXT_RX.findall(preview_content), [],
+                         "Preview contains placeholder patterns")
+        self.assertEqual(_PLACEHOLDER_TEXT_RX.findall(pdf_content), [],
+                         "PDF contains placeholder patterns")
         
         # Check that sections have actual data, not just headers
-        import re
-        
-        # Check Professional Summary
-        for format_name, content in [('preview', preview_content), ('PDF', pdf_content)]:
-            summary_match = re.search(
-                rf'PROFESSIONAL SUMMARY(.*?)(?=(?:CORE SKILLS|PROFESSIONAL EXPERIENCE|$))', 
-                content, re.DOTALL | re.IGNORECASE
-            )
-            self.assertIsNotNone(summary_match, f"Professional Summary not found in {format_name}")
-            summary_content = summary_match.group(1).strip()
-            self.assertIn(self.sample_cv_data.professional_summary, summary_content,
-                         f"Professional Summary in {format_name} missing expected content")
-        
-        # Check Core Skills (check individual skills exist)
-        for format_name, content in [('preview', preview_content), ('PDF', pdf_content)]:
-            skills_match = re.search(
-                rf'CORE SKILLS(.*?)(?=(?:PROFESSIONAL EXPERIENCE|$))', 
-                content, re.DOTALL | re.IGNORECASE
-            )
-            self.assertIsNotNone(skills_match, f"Core Skills not found in {format_name}")
-            skills_content = skills_match.group(1).strip()
-            # Check that at least first 3 skills are present
-            for skill in self.sample_cv_data.skills[:3]:
-                self.assertIn(skill, skills_content,
-                             f"Skill '{skill}' not found in Core Skills section in {format_name}")
-        
-        # Check Professional Experience
-        for format_name, content in [('preview', preview_content), ('PDF', pdf_content)]:
-            experience_match = re.search(
-                rf'PROFESSIONAL EXPERIENCE(.*?)(?=(?:ADDITIONAL INFORMATION|$))', 
-                content, re.DOTALL | re.IGNORECASE
-            )
-            self.assertIsNotNone(experience_match, f"Professional Experience not found in {format_name}")
-            experience_content = experience_match.group(1).strip()
-            self.assertIn(self.sample_cv_data.current_role.job_title, experience_content,
-                         f"Current role job title not found in Professional Experience section in {format_name}")
+        for format_name, content in (('preview', preview_content), ('PDF', pdf_content)):
+            upper = content.upper()
+            for header, expected in _SECTION_EXPECTATIONS:
+                with self.subTest(format=format_name, section=header):
+                    section = self._extract_section(content, upper, header)
+                    self.assertIsNotNone(section, f"{header} not found in {format_name}")
+                    self.assertEqual(self._missing(section, expected(self.sample_cv_data)), [],
+                                     f"{header} in {format_name} missing expected content")
 
 
 if __name__ == '__main__':